@@ -0,0 +1,102 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Overloaded(Exception):
+    # Raised instead of queueing without bound; status is 429 when the wait
+    # queue is full and 503 when a queued request waited too long
+    def __init__(self, message, status=429, retry_after=5):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class AdmissionGate:
+    # Counting semaphore with a bounded wait queue. At most max_active callers
+    # hold a slot; up to max_queued more wait for one, for at most
+    # queue_timeout seconds. max_queued=None waits without bound. Work that
+    # was accepted elsewhere (e.g. background jobs) acquires with block=True:
+    # it waits for a slot however long the queue is, and counts as queued.
+
+    def __init__(self, max_active, max_queued=None, queue_timeout=None, retry_after=5, name="gate"):
+        self.max_active = max(1, max_active)
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.name = name
+        self._active = 0
+        self._queued = 0
+        self._rejected = {"queue_full": 0, "timeout": 0}
+        self._condition = threading.Condition()
+
+    def acquire(self, block=False):
+        with self._condition:
+            if self._active < self.max_active and not self._queued:
+                self._active += 1
+                return
+            if not block and self.max_queued is not None and self._queued >= self.max_queued:
+                self._rejected["queue_full"] += 1
+                raise Overloaded(
+                    f"{self.name}: {self._active} running and {self._queued} queued",
+                    status=429,
+                    retry_after=self.retry_after
+                )
+            self._queued += 1
+            deadline = None if block or self.queue_timeout is None else time.monotonic() + self.queue_timeout
+            try:
+                while self._active >= self.max_active:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self._rejected["timeout"] += 1
+                        # Pass on a wakeup this waiter may have consumed
+                        self._condition.notify()
+                        raise Overloaded(
+                            f"{self.name}: no capacity after waiting {self.queue_timeout:g}s",
+                            status=503,
+                            retry_after=self.retry_after
+                        )
+                    self._condition.wait(remaining)
+                self._active += 1
+            finally:
+                self._queued -= 1
+
+    def try_acquire(self):
+        # Takes a slot only if one is free right now; never queues
+        with self._condition:
+            if self._active < self.max_active and not self._queued:
+                self._active += 1
+                return True
+            return False
+
+    def release(self):
+        with self._condition:
+            self._active -= 1
+            self._condition.notify()
+
+    @contextmanager
+    def slot(self, block=False):
+        self.acquire(block)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self):
+        with self._condition:
+            return {"active": self._active, "queued": self._queued, "rejected": dict(self._rejected)}
+
+
+class InferenceLimiter:
+    # Classifier wrapper that lets at most max_concurrent calls run the model
+    # at once, so concurrent requests don't oversubscribe torch's threads.
+    # Callable with the same interface as the classifier.
+
+    def __init__(self, classify, max_concurrent=1):
+        self.classify = classify
+        self.backend = getattr(classify, "backend", None)
+        self.gate = AdmissionGate(max_concurrent, name="inference")
+
+    def __call__(self, *args, **kwargs):
+        with self.gate.slot():
+            return self.classify(*args, **kwargs)
@@ -0,0 +1,424 @@
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Offline benchmark of the analysis pipeline. The Play Store scraper is
+# replaced by synthetic (or recorded) review fixtures and BART by a tiny
+# keyword classifier, so no network or model download is needed. Each
+# fixture size runs in its own process so peak RSS is measured per size.
+#
+#   python benchmark.py                      # 1k, 10k and 100k reviews
+#   python benchmark.py --sizes 1000 --clients 1,4 --compare benchmark_results/abc1234.json
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+STAGES = ["scrape", "sentiment", "store", "trends", "categorization", "feedback", "serialization", "request"]
+
+PHRASES = {
+    "Feature Requests": ["please add a dark mode", "would love an export option", "wish it had offline sync", "add widgets please"],
+    "Bugs": ["it crashes on launch", "login is not working", "the app keeps freezing", "photos fail to upload"],
+    "UX/UI": ["the interface is cluttered", "buttons are too small", "the new design is confusing", "fonts are hard to read"],
+    "Navigation Issues": ["i can't go back from settings", "the menu is hard to find", "too many taps to reach my profile", "search takes me to the wrong page"],
+    "Performance": ["very slow to load", "it lags when scrolling", "drains my battery", "takes forever to open"],
+    "Others": ["customer support never replied", "too many ads", "the subscription is expensive", "just okay"]
+}
+TONES = [
+    "Absolutely love this app, {phrase}!",
+    "Great app overall but {phrase}.",
+    "It's fine, {phrase}.",
+    "Pretty annoying, {phrase}.",
+    "Terrible experience, {phrase}. Worst app ever."
+]
+
+
+class _Token:
+    # Mimics google_play_scraper's continuation token: token is None on the last page
+    def __init__(self, offset, token):
+        self.offset = offset
+        self.token = token
+
+
+class ReviewFixture:
+    # Serves review pages and app details the way google_play_scraper does
+    def __init__(self, reviews):
+        self.reviews = reviews
+
+    def fetch_page(self, app_id, lang="en", country="us", sort=None, count=100, continuation_token=None, **kwargs):
+        offset = continuation_token.offset if continuation_token else 0
+        page = self.reviews[offset:offset + count]
+        next_offset = offset + len(page)
+        return page, _Token(next_offset, "more" if next_offset < len(self.reviews) else None)
+
+    def fetch_details(self, app_id, lang="en", country="us", **kwargs):
+        return {"title": f"Benchmark {app_id}", "genre": "Tools", "icon": ""}
+
+
+def synthetic_reviews(size, seed=0, now=None):
+    rng = random.Random(seed)
+    now = now or datetime.now()
+    categories = list(PHRASES)
+    reviews = []
+    for i in range(size):
+        phrases = [rng.choice(PHRASES[rng.choice(categories)]) for _ in range(rng.randint(1, 3))]
+        reviews.append({
+            "reviewId": f"synthetic-{i}",
+            "content": rng.choice(TONES).format(phrase=", and ".join(phrases)),
+            "at": now - timedelta(seconds=rng.uniform(0, 400 * 86400)),
+            "score": rng.randint(1, 5)
+        })
+    reviews.sort(key=lambda review: review["at"], reverse=True)
+    return reviews
+
+
+def recorded_reviews(path, size):
+    # JSONL with at least "content" and an ISO "at"; cycled to reach size
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    reviews = []
+    for i in range(size):
+        record = records[i % len(records)]
+        reviews.append({
+            "reviewId": f"recorded-{i}",
+            "content": record["content"],
+            "at": datetime.fromisoformat(record["at"]) if record.get("at") else None,
+            "score": record.get("score")
+        })
+    reviews.sort(key=lambda review: review["at"] or datetime.min, reverse=True)
+    return reviews
+
+
+class StandInClassifier:
+    # Tiny keyword scorer with the zero-shot pipeline's interface. model_ms
+    # adds a fixed per-text cost to approximate a real model.
+    backend = "stand-in"
+
+    def __init__(self, model_ms=0.0):
+        self.model_ms = model_ms
+        self.keywords = {
+            label: {word for phrase in phrases for word in phrase.split() if len(word) > 3}
+            for label, phrases in PHRASES.items()
+        }
+
+    def __call__(self, sequences, candidate_labels, multi_label=False, batch_size=None, **kwargs):
+        single = isinstance(sequences, str)
+        texts = [sequences] if single else list(sequences)
+        if self.model_ms:
+            time.sleep(self.model_ms * len(texts) / 1000.0)
+        results = []
+        for text in texts:
+            words = set(text.lower().replace(",", " ").replace(".", " ").split())
+            raw = [len(words & self.keywords.get(label, set())) + 0.1 for label in candidate_labels]
+            total = sum(raw)
+            ranked = sorted(zip(candidate_labels, (score / total for score in raw)), key=lambda item: -item[1])
+            results.append({
+                "sequence": text,
+                "labels": [label for label, _ in ranked],
+                "scores": [score for _, score in ranked]
+            })
+        return results[0] if single else results
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "median_ms": round(statistics.median(samples) * 1000, 2),
+        "min_ms": round(samples[0] * 1000, 2),
+        "max_ms": round(samples[-1] * 1000, 2),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 2)
+    }
+
+
+def load_main(args, fixture):
+    # main reads its configuration at import time, so the environment is set first
+    scratch = tempfile.mkdtemp(prefix="snappsense-bench-")
+    os.environ["REVIEW_STORE_PATH"] = os.path.join(scratch, "reviews.db")
+    os.environ["INFERENCE_CACHE_PATH"] = os.path.join(scratch, "inference_cache.db")
+    os.environ["REVIEW_BUDGET"] = str(len(fixture.reviews))
+    os.environ["REVIEW_HISTORY_LIMIT"] = str(len(fixture.reviews))
+    os.environ["SCRAPER_RATE"] = "0"
+    os.environ.pop("PRELOAD_MODELS", None)
+    if args.fast_tier_threshold is not None:
+        os.environ["FAST_CATEGORIZER_THRESHOLD"] = str(args.fast_tier_threshold)
+    else:
+        os.environ.pop("FAST_CATEGORIZER_THRESHOLD", None)
+    sys.path.insert(0, BACKEND_DIR)
+    import main
+    from micro_batcher import MicroBatcher
+
+    main.scraper.fetch_page = fixture.fetch_page
+    main.scraper.fetch_details = fixture.fetch_details
+    classifier = StandInClassifier(args.model_ms)
+    if main.INFERENCE_MAX_BATCH > 1:
+        classifier = MicroBatcher(classifier, main.INFERENCE_MAX_BATCH, main.INFERENCE_MAX_WAIT_MS)
+    main.models.set("categorizer", classifier)
+    # Model loading is startup cost, not per-request latency
+    main.models.load_all()
+    return main
+
+
+def run_stages(main, repeat):
+    # Runs the same steps as get_reviews and iter_analysis, timing each one.
+    # Every repetition uses a new app id so nothing is served from the store,
+    # and starts with an empty inference cache.
+    timings = {stage: [] for stage in STAGES}
+    reviews_processed = 0
+    client = main.app.test_client()
+    for i in range(repeat):
+        app_id = f"bench.stages.{i}"
+        if main.inference_cache:
+            main.inference_cache.clear()
+
+        start = time.perf_counter()
+        fresh = main.fetch_new_reviews(app_id)
+        timings["scrape"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        main.enrich_reviews(fresh)
+        sentiment = main.analyze_sentiment(fresh)
+        timings["sentiment"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        main.review_store.add_reviews(app_id, fresh)
+        reviews = main.enrich_reviews(
+            main.review_store.load_reviews(
+                app_id, main.category_source_id(), main.category_labels(), limit=main.REVIEW_HISTORY_LIMIT
+            )
+        )
+        timings["store"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        trends_by_period = main.analyze_trends(reviews)
+        timings["trends"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        categories, routing, intervals = main.categorize_feedback(reviews, app_id)
+        timings["categorization"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        feedback = main.build_feedback(reviews, app_id)
+        timings["feedback"].append(time.perf_counter() - start)
+
+        payload = {
+            "app_name": app_id,
+            "category": "Tools",
+            "icon": "",
+            "sentiment": sentiment,
+            "trends": trends_by_period[main.DEFAULT_PERIOD],
+            "trends_by_period": trends_by_period,
+            "categories": categories,
+            "category_intervals": intervals,
+            "categorization": routing,
+            "feedback": feedback
+        }
+        start = time.perf_counter()
+        with main.app.app_context():
+            main.jsonify(payload).get_data()
+        timings["serialization"].append(time.perf_counter() - start)
+
+        # End to end through Flask, including the store and the result cache
+        start = time.perf_counter()
+        response = client.post("/analyze", json={
+            "url": f"https://play.google.com/store/apps/details?id=bench.request.{i}"
+        })
+        timings["request"].append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise RuntimeError(f"/analyze returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        reviews_processed += len(reviews)
+
+    return {
+        "stages": {stage: summarize(samples) for stage, samples in timings.items()},
+        "reviews_per_second": round(reviews_processed / sum(timings["request"]), 1)
+    }
+
+
+def run_throughput(main, clients, requests_per_client):
+    # N clients each send requests_per_client /analyze calls for apps nobody
+    # has analyzed yet, so every request runs the full pipeline
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def client_loop(client_id):
+        client = main.app.test_client()
+        for i in range(requests_per_client):
+            url = f"https://play.google.com/store/apps/details?id=bench.c{clients}.{client_id}.{i}"
+            start = time.perf_counter()
+            response = client.post("/analyze", json={"url": url})
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if response.status_code != 200:
+                    errors.append(response.status_code)
+
+    threads = [threading.Thread(target=client_loop, args=(client_id,)) for client_id in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    return {
+        "clients": clients,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "requests_per_second": round(len(latencies) / wall, 2),
+        "latency": summarize(latencies)
+    }
+
+
+def run_child(args):
+    fixture = ReviewFixture(
+        recorded_reviews(args.fixture, args.child_size) if args.fixture
+        else synthetic_reviews(args.child_size, args.seed)
+    )
+    main = load_main(args, fixture)
+    if args.child_throughput:
+        result = {
+            "size": args.child_size,
+            "levels": [
+                run_throughput(main, clients, args.requests)
+                for clients in parse_ints(args.clients)
+            ]
+        }
+    else:
+        result = {"size": args.child_size, **run_stages(main, args.repeat)}
+    result["peak_rss_mb"] = peak_rss_mb()
+    with open(args.result_file, "w", encoding="utf-8") as f:
+        json.dump(result, f)
+
+
+def spawn(args, size, throughput=False):
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        result_file = f.name
+    command = [
+        sys.executable, os.path.abspath(__file__),
+        "--child-size", str(size),
+        "--result-file", result_file,
+        "--repeat", str(args.repeat),
+        "--clients", args.clients,
+        "--requests", str(args.requests),
+        "--model-ms", str(args.model_ms),
+        "--seed", str(args.seed)
+    ]
+    if throughput:
+        command.append("--child-throughput")
+    if args.fixture:
+        command += ["--fixture", args.fixture]
+    if args.fast_tier_threshold is not None:
+        command += ["--fast-tier-threshold", str(args.fast_tier_threshold)]
+    # The app prints a line per request; only errors are shown
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL, cwd=BACKEND_DIR)
+    try:
+        with open(result_file, encoding="utf-8") as f:
+            return json.load(f)
+    finally:
+        os.remove(result_file)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=BACKEND_DIR
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def parse_ints(value):
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def compare(baseline, current):
+    # Median stage latency per size, baseline vs current
+    baseline_sizes = {str(entry["size"]): entry for entry in baseline["sizes"]}
+    for entry in current["sizes"]:
+        previous = baseline_sizes.get(str(entry["size"]))
+        if not previous:
+            continue
+        print(f"\n{entry['size']} reviews ({baseline.get('commit')} -> {current.get('commit')})")
+        for stage in STAGES:
+            if stage not in entry["stages"] or stage not in previous["stages"]:
+                continue
+            before = previous["stages"][stage]["median_ms"]
+            after = entry["stages"][stage]["median_ms"]
+            change = f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+            print(f"  {stage:<15}{before:>12.2f} ms{after:>12.2f} ms{change:>10}")
+        print(f"  {'peak rss':<15}{previous['peak_rss_mb']:>12.1f} MB{entry['peak_rss_mb']:>12.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark of the review analysis pipeline")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Fixture sizes, comma separated")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per fixture size")
+    parser.add_argument("--clients", default="1,4,8", help="Concurrent client counts for the throughput test")
+    parser.add_argument("--requests", type=int, default=4, help="Requests per client")
+    parser.add_argument("--throughput-size", type=int, default=1000, help="Fixture size used by the throughput test")
+    parser.add_argument("--model-ms", type=float, default=0.0, help="Simulated per-review cost of the stand-in classifier")
+    parser.add_argument("--fixture", help="JSONL file of recorded reviews to use instead of synthetic ones")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fast-tier-threshold", type=float, help="Enable the TF-IDF/NaiveBayes tier at this confidence threshold")
+    parser.add_argument("--output", help="Results file (default: benchmark_results/<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--child-size", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--child-throughput", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child_size:
+        run_child(args)
+        sys.exit(0)
+
+    commit = git_commit()
+    results = {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": {
+            "repeat": args.repeat,
+            "model_ms": args.model_ms,
+            "fixture": args.fixture or "synthetic",
+            "seed": args.seed,
+            "fast_tier_threshold": args.fast_tier_threshold
+        },
+        "sizes": []
+    }
+    for size in parse_ints(args.sizes):
+        print(f"Benchmarking {size} reviews...")
+        entry = spawn(args, size)
+        results["sizes"].append(entry)
+        print(json.dumps({stage: timing["median_ms"] for stage, timing in entry["stages"].items()}))
+        print(f"peak RSS {entry['peak_rss_mb']} MB")
+
+    print(f"Throughput with {args.throughput_size} reviews per app...")
+    results["throughput"] = spawn(args, args.throughput_size, throughput=True)
+    for level in results["throughput"]["levels"]:
+        print(f"{level['clients']} clients: {level['requests_per_second']} req/s, p95 {level['latency']['p95_ms']} ms")
+
+    output = args.output or os.path.join(BACKEND_DIR, "benchmark_results", f"{commit or 'results'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), results)
@@ -0,0 +1,95 @@
+import re
+import string
+
+import numpy as np
+
+# Mersenne prime for the MinHash permutations; every intermediate product fits in uint64
+_PRIME = (1 << 31) - 1
+_PUNCTUATION = str.maketrans(string.punctuation, " " * len(string.punctuation))
+_REPEATS = re.compile(r"(\w)\1{2,}")
+
+
+def normalize_text(text):
+    # "Worst app EVER!!! sooo slow" -> "worst app ever soo slow"
+    text = _REPEATS.sub(r"\1\1", (text or "").lower().translate(_PUNCTUATION))
+    return " ".join(text.split())
+
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def _union(parent, a, b):
+    # The smallest index stays the root, so it represents the cluster
+    a, b = _find(parent, a), _find(parent, b)
+    if a != b:
+        parent[max(a, b)] = min(a, b)
+
+
+def minhash_signatures(texts, num_perm=32, seed=1):
+    # Character 3-gram MinHash of every text, computed for all texts at once:
+    # the 3-grams of the concatenated bytes are hashed num_perm ways and
+    # reduced to a per-text minimum with np.minimum.reduceat
+    encoded = [f" {text} ".encode("utf-8").ljust(3) for text in texts]
+    lengths = np.array([len(data) for data in encoded], dtype=np.int64)
+    buffer = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+    grams = (buffer[:-2] << np.uint64(16)) | (buffer[1:-1] << np.uint64(8)) | buffer[2:]
+    # Keep only the 3-grams that lie inside a single text
+    owner = np.repeat(np.arange(len(texts)), lengths)[:-2]
+    offset = np.arange(len(buffer) - 2) - np.repeat(np.cumsum(lengths) - lengths, lengths)[:-2]
+    grams = grams[offset <= lengths[owner] - 3]
+    starts = np.concatenate(([0], np.cumsum(lengths - 2)[:-1]))
+
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint64)
+    for k in range(num_perm):
+        hashed = (a[k] * grams + b[k]) % np.uint64(_PRIME)
+        signatures[:, k] = np.minimum.reduceat(hashed, starts)
+    return signatures
+
+
+def cluster_texts(texts, threshold=0.85, num_perm=32, bands=8, seed=1):
+    # Returns, for every text, the index of its cluster's representative (the
+    # first text of the cluster). Texts with the same normalized form are
+    # exact duplicates; the remaining distinct texts are grouped when their
+    # estimated Jaccard similarity over character 3-grams reaches threshold,
+    # using MinHash with banded LSH to find candidate pairs.
+    representatives = np.arange(len(texts))
+    first_seen = {}
+    unique = []
+    for i, text in enumerate(texts):
+        normalized = normalize_text(text)
+        first = first_seen.setdefault(normalized, i)
+        representatives[i] = first
+        if first == i:
+            unique.append((i, normalized))
+
+    if len(unique) < 2 or threshold >= 1:
+        return representatives
+
+    signatures = minhash_signatures([normalized for _, normalized in unique], num_perm, seed)
+    unique = [i for i, _ in unique]
+    parent = list(range(len(unique)))
+    rows = num_perm // bands
+    for band in range(bands):
+        keys = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        keys = keys.view(np.dtype((np.void, keys.dtype.itemsize * rows))).ravel()
+        _, bucket_of = np.unique(keys, return_inverse=True)
+        order = np.argsort(bucket_of, kind="stable")
+        boundaries = np.flatnonzero(np.diff(bucket_of[order])) + 1
+        for bucket in np.split(order, boundaries):
+            if len(bucket) < 2:
+                continue
+            # Verify every candidate against the bucket's first member
+            anchor = bucket[0]
+            similarity = (signatures[bucket[1:]] == signatures[anchor]).mean(axis=1)
+            for member in bucket[1:][similarity >= threshold]:
+                _union(parent, anchor, member)
+
+    root_of_unique = {unique[j]: unique[_find(parent, j)] for j in range(len(unique))}
+    return np.array([root_of_unique[first] for first in representatives])
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+# Categorizer that embeds each review once and compares it with one prototype
+# embedding per label, so a batch costs one encoder pass and one matrix
+# multiply however many labels there are. Prototypes are the normalized mean
+# embedding of a label's description and example reviews, read from a JSON
+# file (see label_prototypes.json); "solutions" are optional suggestions
+# shown with the label's top complaints:
+#
+#   {"labels": {"Bugs": {"description": "...", "examples": ["...", ...], "solutions": [...]}, ...}}
+#
+# The file also defines the label set. Editing it refreshes the prototypes on
+# the next call, without a restart.
+
+_prototype_files = {}  # path -> (mtime_ns, fingerprint, labels config)
+
+
+def read_prototypes(path):
+    # (content hash, {label: config}) of the prototypes file, re-read only
+    # when it changes
+    mtime = os.stat(path).st_mtime_ns
+    cached = _prototype_files.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1], cached[2]
+    with open(path, "rb") as f:
+        raw = f.read()
+    fingerprint = hashlib.sha1(raw).hexdigest()[:12]
+    config = json.loads(raw)["labels"]
+    _prototype_files[path] = (mtime, fingerprint, config)
+    return fingerprint, config
+
+
+def prototypes_fingerprint(path):
+    return read_prototypes(path)[0]
+
+
+def prototype_labels(path):
+    return list(read_prototypes(path)[1])
+
+
+class SentenceEncoder:
+    # Mean-pooled, L2-normalized embeddings from a compact transformer
+    # (all-MiniLM-L6-v2 by default, ~22M parameters, fast on CPU)
+
+    def __init__(self, model_id="sentence-transformers/all-MiniLM-L6-v2", device=-1, max_length=128, batch_size=64):
+        # torch/transformers are imported here so reading prototypes stays cheap
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        self._torch = torch
+        self.model_id = model_id
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.device = torch.device(f"cuda:{device}" if device >= 0 else "cpu")
+        self.tokenizer = AutoTokenizer.from_pretrained(model_id)
+        self.model = AutoModel.from_pretrained(model_id).to(self.device).eval()
+
+    def encode(self, texts):
+        # Sorted by length so each batch carries little padding
+        embeddings = np.zeros((len(texts), self.model.config.hidden_size), dtype=np.float32)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        with self._torch.inference_mode():
+            for start in range(0, len(order), self.batch_size):
+                batch = order[start:start + self.batch_size]
+                encoded = self.tokenizer(
+                    [texts[i] for i in batch],
+                    truncation=True,
+                    max_length=self.max_length,
+                    padding=True,
+                    return_tensors="pt"
+                ).to(self.device)
+                hidden = self.model(**encoded).last_hidden_state
+                mask = encoded["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+                pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+                pooled = self._torch.nn.functional.normalize(pooled, dim=-1)
+                embeddings[batch] = pooled.cpu().numpy()
+        return embeddings
+
+
+class EmbeddingCategorizer:
+    # Callable with the same interface as the zero-shot pipeline. Scores are a
+    # softmax over the cosine similarities to the candidate labels'
+    # prototypes, sharpened by temperature; labels without a prototype score 0.
+    backend = "embedding"
+
+    def __init__(self, encoder, prototypes_path, temperature=0.05):
+        self.encoder = encoder
+        self.prototypes_path = prototypes_path
+        self.temperature = temperature
+        self._lock = threading.Lock()
+        # (fingerprint, labels, prototype matrix), built on first use since
+        # it runs the encoder
+        self._state = None
+
+    @property
+    def version(self):
+        self.refresh()
+        return f"{self.encoder.model_id}:{self._state[0]}"
+
+    @property
+    def labels(self):
+        self.refresh()
+        return self._state[1]
+
+    def refresh(self, force=False):
+        # Recomputes the prototypes if the file changed since they were built
+        fingerprint, config = read_prototypes(self.prototypes_path)
+        if not force and self._state and self._state[0] == fingerprint:
+            return False
+        with self._lock:
+            if not force and self._state and self._state[0] == fingerprint:
+                return False
+            labels = list(config)
+            texts, owners = [], []
+            for i, label in enumerate(labels):
+                for text in [config[label].get("description") or label] + list(config[label].get("examples", [])):
+                    texts.append(text)
+                    owners.append(i)
+            embeddings = self.encoder.encode(texts)
+            prototypes = np.zeros((len(labels), embeddings.shape[1]), dtype=np.float32)
+            np.add.at(prototypes, np.array(owners), embeddings)
+            prototypes /= np.maximum(np.linalg.norm(prototypes, axis=1, keepdims=True), 1e-12)
+            # Swapped in one assignment, so calls in flight see old or new, never a mix
+            self._state = (fingerprint, labels, prototypes)
+        print(f"Label prototypes built for {len(labels)} labels from {len(texts)} texts ({fingerprint})")
+        return True
+
+    def encode(self, texts):
+        # Normalized review embeddings
+        return self.encoder.encode(list(texts))
+
+    def scores(self, embeddings, candidate_labels):
+        _, labels, prototypes = self._state
+        known = [label in labels for label in candidate_labels]
+        columns = [labels.index(label) for label, present in zip(candidate_labels, known) if present]
+        scores = np.zeros((len(embeddings), len(candidate_labels)), dtype=np.float32)
+        if not columns:
+            return scores
+        logits = embeddings @ prototypes[columns].T / self.temperature
+        probabilities = np.exp(logits - logits.max(axis=1, keepdims=True))
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        scores[:, np.flatnonzero(known)] = probabilities
+        return scores
+
+    def __call__(self, sequences, candidate_labels, multi_label=False, batch_size=None, **kwargs):
+        single = isinstance(sequences, str)
+        texts = [sequences] if single else list(sequences)
+        if not texts:
+            return []
+        try:
+            self.refresh()
+        except Exception as e:
+            if self._state is None:
+                raise
+            print(f"Label prototype refresh error: {str(e)}")
+        scores = self.scores(self.encode(texts), candidate_labels)
+        order = np.argsort(-scores, axis=1, kind="stable")
+        results = [
+            {
+                "sequence": text,
+                "labels": [candidate_labels[j] for j in ranking],
+                "scores": row[ranking].tolist()
+            }
+            for text, row, ranking in zip(texts, scores, order)
+        ]
+        return results[0] if single else results
@@ -0,0 +1,87 @@
+import argparse
+import json
+import os
+
+import joblib
+import numpy as np
+
+
+class FastCategorizer:
+    # TF-IDF + MultinomialNB tier that classifies a whole batch in one
+    # vectorized call. Only classes that are also candidate labels can be
+    # predicted. The confidence is the label's share of the posterior over
+    # those classes alone, so classes that are not categories (the shipped
+    # model also knows sentiment labels) don't dilute it.
+
+    def __init__(self, vectorizer_path, model_path, candidate_labels):
+        self.vectorizer = joblib.load(vectorizer_path)
+        self.model = joblib.load(model_path)
+        classes = list(self.model.classes_)
+        self.labels = [label for label in candidate_labels if label in classes]
+        self._columns = np.array([classes.index(label) for label in self.labels], dtype=int)
+        if not self.labels:
+            raise ValueError("Fast categorizer shares no classes with the candidate labels")
+
+    def predict(self, texts):
+        if not texts:
+            return [], np.zeros(0)
+        probabilities = self.model.predict_proba(self.vectorizer.transform(texts))[:, self._columns]
+        totals = probabilities.sum(axis=1)
+        probabilities = probabilities / np.where(totals > 0, totals, 1)[:, None]
+        best = probabilities.argmax(axis=1)
+        confidences = probabilities[np.arange(len(texts)), best]
+        return [self.labels[i] for i in best], confidences
+
+
+def calibrate(categorizer, texts, expected, target_precision=0.9, min_routed=20):
+    # Coverage and precision of the reviews the tier would route at each
+    # threshold. The suggested threshold is the lowest one whose routed
+    # reviews reach target_precision; None if no threshold does.
+    predicted, confidences = categorizer.predict(texts)
+    correct = np.array([label == truth for label, truth in zip(predicted, expected)], dtype=bool)
+    table = []
+    suggested = None
+    for threshold in np.round(np.arange(0.3, 1.0, 0.05), 2):
+        routed = confidences >= threshold
+        precision = float(correct[routed].mean()) if routed.any() else None
+        table.append({
+            "threshold": float(threshold),
+            "coverage": round(float(routed.mean()), 4) if len(texts) else 0.0,
+            "precision": round(precision, 4) if precision is not None else None
+        })
+        if suggested is None and routed.sum() >= min_routed and precision >= target_precision:
+            suggested = float(threshold)
+    return {"size": len(texts), "target_precision": target_precision, "threshold": suggested, "thresholds": table}
+
+
+if __name__ == "__main__":
+    from text_classifier import resolve_artifact
+
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.dirname(backend_dir)
+
+    parser = argparse.ArgumentParser(description="Calibrate FAST_CATEGORIZER_THRESHOLD on a held-out set")
+    parser.add_argument("--heldout", help="JSONL with text and label fields (default: the fine-tuned artifact's heldout.jsonl)")
+    parser.add_argument("--artifact", default=os.path.join(backend_dir, "models", "feedback_classifier"))
+    parser.add_argument("--vectorizer", default=os.path.join(project_root, "vectorizer.pkl"))
+    parser.add_argument("--model", default=os.path.join(project_root, "categorization_model.pkl"))
+    parser.add_argument("--precision", type=float, default=0.9, help="Precision the routed reviews must reach")
+    parser.add_argument("--min-routed", type=int, default=20, help="Fewest routed reviews a threshold needs to count")
+    args = parser.parse_args()
+
+    heldout_path = args.heldout or os.path.join(resolve_artifact(args.artifact), "heldout.jsonl")
+    with open(heldout_path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+
+    labels = sorted({record["label"] for record in records})
+    categorizer = FastCategorizer(args.vectorizer, args.model, labels)
+    # Reviews whose label the model cannot predict count against it
+    report = calibrate(
+        categorizer,
+        [record["text"] for record in records],
+        [record["label"] for record in records],
+        target_precision=args.precision,
+        min_routed=args.min_routed
+    )
+    report["labels"] = categorizer.labels
+    print(json.dumps(report, indent=2))
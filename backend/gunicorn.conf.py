@@ -0,0 +1,38 @@
+# Production serving: gunicorn -c gunicorn.conf.py main:app (run from backend/)
+#
+# The app is imported once in the parent process with PRELOAD_MODELS=1, which
+# loads every model before the workers are forked. Workers then share the
+# model weights copy-on-write instead of each loading their own copy, and
+# warm them up (sizing their own torch thread pool) right after the fork.
+#
+# WEB_WORKERS processes each serve WEB_THREADS requests at once. main.py reads
+# the same variables to split the cores between the workers' torch thread
+# pools and to size the analysis admission queue.
+import os
+
+os.environ.setdefault("PRELOAD_MODELS", "1")
+os.environ.setdefault("WEB_WORKERS", "2")
+os.environ.setdefault("WEB_THREADS", "4")
+# OpenMP/MKL read this before torch is imported; main.py sets torch's own
+# thread counts when it loads the model
+os.environ.setdefault(
+    "OMP_NUM_THREADS",
+    os.getenv("TORCH_THREADS") or str(max(1, (os.cpu_count() or 1) // int(os.environ["WEB_WORKERS"])))
+)
+
+bind = os.getenv("BIND", "0.0.0.0:5001")
+workers = int(os.environ["WEB_WORKERS"])
+threads = int(os.environ["WEB_THREADS"])
+worker_class = "gthread"
+preload_app = True
+timeout = int(os.getenv("WEB_TIMEOUT", "300"))
+# Connections waiting for a worker thread; analyses beyond the admission
+# queue are answered 429 instead of sitting here
+backlog = int(os.getenv("WEB_BACKLOG", "64"))
+
+
+def post_fork(server, worker):
+    import main
+
+    main.models.load_all()
+    server.log.info(f"Worker {worker.pid} forked with preloaded models, warmed up")
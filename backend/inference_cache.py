@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from dedup import normalize_text
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS inference_cache (
+    key TEXT PRIMARY KEY,
+    namespace TEXT NOT NULL,
+    result TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_inference_cache_last_used ON inference_cache (last_used);
+"""
+
+
+def cache_namespace(model_id, labels):
+    # Changes whenever the model or the candidate labels do, so every
+    # existing entry stops matching
+    return hashlib.sha256(json.dumps([model_id, list(labels)]).encode("utf-8")).hexdigest()[:16]
+
+
+class InferenceCache:
+    # Classifier outputs keyed by a hash of the normalized text within a
+    # namespace (model id + label set). A bounded in-memory LRU sits in front
+    # of a SQLite table that survives restarts; the table keeps the
+    # max_disk_entries most recently used entries. Entries from any other
+    # namespace are dropped when the cache is opened. path=None keeps the
+    # memory tier only.
+
+    def __init__(self, path, namespace, max_memory_entries=50000, max_disk_entries=1000000):
+        self.path = path
+        self.namespace = namespace
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()  # key -> result
+        self._lock = threading.Lock()
+        self._conn_pid = None
+        self._disk_entries = 0
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        if path:
+            self._connect()
+            with self._lock, self._conn:
+                purged = self._conn.execute(
+                    "DELETE FROM inference_cache WHERE namespace != ?", (namespace,)
+                ).rowcount
+            self._disk_entries -= purged
+            if purged:
+                print(f"Inference cache: dropped {purged} entries from an earlier model or label set")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        self._conn_pid = os.getpid()
+        self._connection = conn
+        self._disk_entries = conn.execute("SELECT COUNT(*) FROM inference_cache").fetchone()[0]
+
+    @property
+    def _conn(self):
+        # A connection opened before fork must not be used by the workers
+        if self._conn_pid != os.getpid():
+            self._connect()
+        return self._connection
+
+    def use_namespace(self, namespace):
+        # Switches to a new model or label set at runtime; entries from the
+        # old namespace no longer match and age out of the disk table
+        if namespace == self.namespace:
+            return
+        with self._lock:
+            self.namespace = namespace
+            self._memory.clear()
+
+    def key(self, text):
+        return hashlib.sha256(f"{self.namespace}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key, result):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys):
+        # Returns one cached result (or None) per key from key()
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+            self._stats["memory_hits"] += len(found)
+            missing = [key for key in dict.fromkeys(keys) if key not in found]
+            if self.path and missing:
+                for start in range(0, len(missing), 500):
+                    chunk = missing[start:start + 500]
+                    rows = self._conn.execute(
+                        f"SELECT key, result FROM inference_cache WHERE key IN ({','.join('?' * len(chunk))})",
+                        chunk
+                    ).fetchall()
+                    for key, result in rows:
+                        found[key] = json.loads(result)
+                        self._remember(key, found[key])
+                    self._stats["disk_hits"] += len(rows)
+                    if rows:
+                        with self._conn:
+                            self._conn.executemany(
+                                "UPDATE inference_cache SET last_used = ? WHERE key = ?",
+                                [(time.time(), key) for key, _ in rows]
+                            )
+            results = [found.get(key) for key in keys]
+            self._stats["misses"] += sum(1 for result in results if result is None)
+        return results
+
+    def put_many(self, keys, results):
+        entries = dict(zip(keys, results))
+        with self._lock:
+            for key, result in entries.items():
+                self._remember(key, result)
+            if not self.path or not entries:
+                return
+            now = time.time()
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO inference_cache (key, namespace, result, last_used) VALUES (?, ?, ?, ?)",
+                    [(key, self.namespace, json.dumps(result), now) for key, result in entries.items()]
+                )
+            self._disk_entries += len(entries)
+            if self._disk_entries > self.max_disk_entries:
+                self._evict()
+
+    def _evict(self):
+        # Trims to 90% of the limit so eviction doesn't run on every write
+        with self._conn:
+            total = self._conn.execute("SELECT COUNT(*) FROM inference_cache").fetchone()[0]
+            excess = total - int(self.max_disk_entries * 0.9)
+            if excess > 0 and total > self.max_disk_entries:
+                self._conn.execute(
+                    "DELETE FROM inference_cache WHERE key IN "
+                    "(SELECT key FROM inference_cache ORDER BY last_used LIMIT ?)",
+                    (excess,)
+                )
+                self._stats["evictions"] += excess
+                total -= excess
+        self._disk_entries = total
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self.path:
+                with self._conn:
+                    self._conn.execute("DELETE FROM inference_cache")
+                self._disk_entries = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._stats,
+                "memory_entries": len(self._memory),
+                "disk_entries": self._disk_entries
+            }
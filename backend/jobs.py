@@ -0,0 +1,103 @@
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, params):
+        self.id = uuid.uuid4().hex
+        self.params = params
+        self.status = "queued"
+        self.progress = {}
+        self.result = None
+        self.status_code = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def report(self, stage, **info):
+        with self._lock:
+            self.progress[stage] = info
+
+    def to_dict(self):
+        with self._lock:
+            data = {
+                "job_id": self.id,
+                "status": self.status,
+                "progress": dict(self.progress),
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at
+            }
+            if self.status == "done":
+                data["result"] = self.result
+                data["status_code"] = self.status_code
+            elif self.status == "failed":
+                data["error"] = self.error
+            return data
+
+
+class JobManager:
+    # Runs analysis jobs on a bounded worker pool. Submissions beyond
+    # max_pending queued/running jobs are rejected, and finished jobs are
+    # forgotten ttl_seconds after they complete.
+
+    def __init__(self, run, max_workers=2, max_pending=16, ttl_seconds=900):
+        self._run = run
+        self.max_pending = max_pending
+        self.ttl_seconds = ttl_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, **params):
+        with self._lock:
+            self._expire()
+            pending = sum(1 for job in self._jobs.values() if job.status in ("queued", "running"))
+            if pending >= self.max_pending:
+                raise JobQueueFull(f"{pending} jobs already queued or running")
+            job = Job(params)
+            self._jobs[job.id] = job
+        self._executor.submit(self._execute, job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            self._expire()
+            return self._jobs.get(job_id)
+
+    def pending(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status in ("queued", "running"))
+
+    def _execute(self, job):
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            result, status_code = self._run(progress=job.report, **job.params)
+            job.result = result
+            job.status_code = status_code
+            job.status = "done"
+        except Exception as e:
+            traceback.print_exc()
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
@@ -0,0 +1,70 @@
+import hashlib
+import json
+import re
+
+
+def _is_word_char(char):
+    # Same characters as the regex \w
+    return char.isalnum() or char == "_"
+
+
+class KeywordRules:
+    # Keyword overrides matched with a substring scan per rule. Patterns are
+    # matched on word boundaries; a trailing "*" also matches any word suffix
+    # ("crash*" matches "crashes"). When several rules match a review, the one
+    # with the highest priority wins.
+
+    def __init__(self, rules, prefilter_min_priority=0):
+        self.rules = sorted(rules, key=lambda rule: -rule["priority"])
+        self.prefilter_min_priority = prefilter_min_priority
+        self.fingerprint = hashlib.sha1(
+            json.dumps([self.rules, prefilter_min_priority], sort_keys=True).encode("utf-8")
+        ).hexdigest()[:12]
+        # Per rule: the distinct first words to look for with str.find, and one
+        # regex that checks the whole phrase and its end boundary from there
+        self._rule_matchers = []
+        for rule in self.rules:
+            # Longer phrases first so they win over their own sub-phrases
+            phrases = sorted(rule["patterns"], key=len, reverse=True)
+            first_words = sorted({phrase.rstrip("*").split()[0] for phrase in phrases}, key=len)
+            anchors = []
+            for word in first_words:
+                if not any(word.startswith(anchor) for anchor in anchors):
+                    anchors.append(word)
+            pattern = re.compile("(?:" + "|".join(self._compile_phrase(phrase) for phrase in phrases) + r")\b")
+            self._rule_matchers.append((rule, anchors, pattern))
+
+    @staticmethod
+    def _compile_phrase(phrase):
+        suffix = r"\w*" if phrase.endswith("*") else ""
+        words = phrase.rstrip("*").split()
+        return r"[ \t]+".join(re.escape(word) for word in words) + suffix
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+        return cls(config["rules"], config.get("prefilter_min_priority", 0))
+
+    def match(self, text):
+        return self.match_many([text])[0]
+
+    def match_many(self, texts):
+        # Returns the winning rule or None per text. Rules are tried from the
+        # highest priority down; each looks for its first words as plain
+        # substrings and runs its regex only where one starts a word
+        return [self._match_text(text) for text in texts]
+
+    def _match_text(self, text):
+        for rule, anchors, pattern in self._rule_matchers:
+            for anchor in anchors:
+                start = text.find(anchor)
+                while start != -1:
+                    if (start == 0 or not _is_word_char(text[start - 1])) and pattern.match(text, start):
+                        return rule
+                    start = text.find(anchor, start + 1)
+        return None
+
+    def skips_model(self, rule):
+        # A rule strong enough to decide the category without model inference
+        return rule is not None and rule["priority"] >= self.prefilter_min_priority
@@ -1,29 +1,251 @@
 import os
 from dotenv import load_dotenv
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
 from google_play_scraper import reviews, app as play_store_app
-from transformers import pipeline, AutoConfig
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-from datetime import datetime, timedelta
 from collections import defaultdict
-import torch
+import contextvars
+import cProfile
+import gc
+import io
+import json
+import pstats
 import random
+import threading
+import time
+import zlib
+import numpy as np
 from urllib.parse import urlparse, parse_qs
+from review_store import ReviewStore
+from result_cache import ResultCache
+from jobs import JobManager, JobQueueFull
+from fast_categorizer import FastCategorizer
+from micro_batcher import MicroBatcher
+from model_registry import ModelRegistry
+from keyword_rules import KeywordRules
+from trends import DEFAULT_PERIOD, SENTIMENT_CODES, SENTIMENT_LABELS, calculate_all_trends
+from scraper import ReviewScraper, parse_locales
+from sampling import AdaptiveEstimator
+from metrics import MetricsRegistry, StageTimer, server_timing
+from dedup import cluster_texts
+from review_batch import NO_CODE, ReviewBatch
+from sentiment import SentimentEngine, sentiment_codes
+from text_classifier import read_artifact
+from embedding_categorizer import prototype_labels, prototypes_fingerprint, read_prototypes
+from admission import AdmissionGate, InferenceLimiter, Overloaded
+from inference_cache import InferenceCache, cache_namespace
 
 # Load environment variables
 load_dotenv()
 
 # Initialize Flask app
 app = Flask(__name__)
-CORS(app, resources={r"/analyze": {"origins": "http://localhost:5173"}})
+CORS(app, resources={r"/analyze.*": {"origins": "http://localhost:5173"}})
 
-# Load VADER for sentiment analysis
-vader_analyzer = SentimentIntensityAnalyzer()
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BACKEND_DIR)
 
-# Load Zero-shot Classifier (BART for categorization)
+# Persistent review store so repeat requests only fetch new reviews
+REVIEW_STORE_PATH = os.getenv("REVIEW_STORE_PATH", os.path.join(BACKEND_DIR, "reviews.db"))
+REVIEW_HISTORY_LIMIT = int(os.getenv("REVIEW_HISTORY_LIMIT", "10000"))
+INITIAL_REVIEW_COUNT = int(os.getenv("REVIEW_BUDGET", "1000"))
+CATEGORIZE_CHUNK_SIZE = 8
+# Order and payload keys of the events sent by /analyze/stream
+STREAM_STAGES = [
+    ("app", ["app_name", "category", "icon"]),
+    ("sentiment", ["sentiment"]),
+    ("trends", ["trends", "trends_by_period"]),
+    ("categories", ["categories", "category_intervals", "categorization"]),
+    ("feedback", ["feedback"])
+]
+# Largest number of apps accepted by /analyze/batch
+BATCH_MAX_APPS = int(os.getenv("BATCH_MAX_APPS", "50"))
+# Concurrent, rate-limited Play Store scraping. SCRAPER_LOCALES is a comma
+# separated list of lang:country pairs whose reviews are merged together.
+SCRAPER_LOCALES = parse_locales(os.getenv("SCRAPER_LOCALES", "en:us"))
+scraper = ReviewScraper(
+    fetch_page=reviews,
+    fetch_details=play_store_app,
+    max_workers=int(os.getenv("SCRAPER_WORKERS", "4")),
+    rate_per_second=float(os.getenv("SCRAPER_RATE", "5")),
+    retries=int(os.getenv("SCRAPER_RETRIES", "3"))
+)
 try:
-    config = AutoConfig.from_pretrained("facebook/bart-large-mnli")
+    review_store = ReviewStore(REVIEW_STORE_PATH)
+except Exception as e:
+    print(f"Review store error: {str(e)}")
+    review_store = None
+
+# Cache of finished /analyze results keyed by app_id; every period's trends
+# are in the cached payload, so switching periods is a cache hit
+result_cache = ResultCache(
+    max_entries=int(os.getenv("RESULT_CACHE_SIZE", "128")),
+    ttl_seconds=float(os.getenv("RESULT_CACHE_TTL", "600"))
+)
+
+# Prometheus-style metrics served on /metrics. Stage timings also go out in
+# the Server-Timing header of the request that ran them.
+metrics = MetricsRegistry(prefix="snappsense_")
+request_seconds = metrics.histogram("request_duration_seconds", "HTTP request latency by endpoint and status")
+stage_timer = StageTimer(metrics.histogram("stage_duration_seconds", "Analysis pipeline stage latency"))
+reviews_processed = metrics.counter("reviews_processed_total", "Reviews run through the analysis pipeline")
+model_batch_size = metrics.histogram(
+    "model_batch_size",
+    "Texts per zero-shot inference batch",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
+# Opt-in cProfile of single requests (X-Profile: 1 header or ?profile=1);
+# only honoured when PROFILING_ENABLED=1, e.g. in staging
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED") == "1"
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(BACKEND_DIR, "profiles"))
+
+# Serving limits. WEB_WORKERS/WEB_THREADS match gunicorn.conf.py; torch gets
+# an equal share of the cores per worker unless TORCH_THREADS is set.
+# At most ANALYSIS_MAX_ACTIVE uncached analyses run per worker, with up to
+# ANALYSIS_MAX_QUEUED more waiting ANALYSIS_QUEUE_TIMEOUT seconds for a
+# slot; beyond that requests get 429 (queue full) or 503 (waited too long).
+# Together they default to one less than WEB_THREADS, so a handler thread is
+# always free to answer cached requests and turn the rest away.
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", "2"))
+WEB_THREADS = int(os.getenv("WEB_THREADS", "4"))
+ANALYSIS_MAX_ACTIVE = int(os.getenv("ANALYSIS_MAX_ACTIVE", "0")) or max(1, WEB_THREADS // 2)
+ANALYSIS_MAX_QUEUED = int(os.getenv("ANALYSIS_MAX_QUEUED", str(max(0, WEB_THREADS - ANALYSIS_MAX_ACTIVE - 1))))
+TORCH_THREADS = int(os.getenv("TORCH_THREADS", "0")) or max(1, (os.cpu_count() or 1) // WEB_WORKERS)
+TORCH_INTEROP_THREADS = int(os.getenv("TORCH_INTEROP_THREADS", "1"))
+INFERENCE_CONCURRENCY = int(os.getenv("INFERENCE_CONCURRENCY", "1"))
+analysis_gate = AdmissionGate(
+    max_active=ANALYSIS_MAX_ACTIVE,
+    max_queued=ANALYSIS_MAX_QUEUED,
+    queue_timeout=float(os.getenv("ANALYSIS_QUEUE_TIMEOUT", "30")),
+    retry_after=int(os.getenv("ANALYSIS_RETRY_AFTER", "10")),
+    name="analysis"
+)
+
+# Model configuration. Models themselves are loaded lazily through the
+# registry below, or up front when PRELOAD_MODELS=1 (see gunicorn.conf.py).
+CATEGORIZATION_MODEL_ID = "facebook/bart-large-mnli"
+# Inference backend: "pytorch" (default), "quantized" (dynamic int8) or "onnx"
+ZERO_SHOT_BACKEND = os.getenv("ZERO_SHOT_BACKEND", "pytorch")
+ZERO_SHOT_MAX_LENGTH = int(os.getenv("ZERO_SHOT_MAX_LENGTH", "256"))
+# Cross-request micro-batching; INFERENCE_MAX_BATCH=1 calls the model directly
+INFERENCE_MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", "32"))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "10"))
+ZERO_SHOT_SOURCE_ID = (
+    CATEGORIZATION_MODEL_ID if ZERO_SHOT_BACKEND == "pytorch" else f"{CATEGORIZATION_MODEL_ID}:{ZERO_SHOT_BACKEND}"
+)
+# Categorization model: "zero-shot" (BART NLI, one pass per candidate label),
+# "fine-tuned" (the single-pass classifier written by train_model.py) or
+# "embedding" (sentence embeddings against label prototypes, one pass for
+# any number of labels)
+CATEGORIZATION_MODEL = os.getenv("CATEGORIZATION_MODEL", "zero-shot")
+FINE_TUNED_MODEL_DIR = os.getenv("FINE_TUNED_MODEL_DIR", os.path.join(BACKEND_DIR, "models", "feedback_classifier"))
+EMBEDDING_MODEL_ID = os.getenv("EMBEDDING_MODEL_ID", "sentence-transformers/all-MiniLM-L6-v2")
+# Descriptions and example reviews per label; edits are picked up without a restart
+LABEL_PROTOTYPES_PATH = os.getenv("LABEL_PROTOTYPES_PATH", os.path.join(BACKEND_DIR, "label_prototypes.json"))
+if CATEGORIZATION_MODEL == "fine-tuned":
+    try:
+        CATEGORIZER_SOURCE_ID = f"fine-tuned:{read_artifact(FINE_TUNED_MODEL_DIR)['version']}"
+    except Exception as e:
+        print(f"Model artifact error: {str(e)}")
+        CATEGORIZER_SOURCE_ID = "fine-tuned:unavailable"
+else:
+    CATEGORIZER_SOURCE_ID = ZERO_SHOT_SOURCE_ID
+CATEGORY_LABELS = [
+    "Feature Requests",
+    "Bugs",
+    "UX/UI",
+    "Navigation Issues",
+    "Performance",
+    "Others"
+]
+def category_labels():
+    # The embedding categorizer takes its label set from the prototypes file,
+    # so labels added there are used without a code change or restart
+    if CATEGORIZATION_MODEL == "embedding":
+        try:
+            return prototype_labels(LABEL_PROTOTYPES_PATH)
+        except Exception as e:
+            print(f"Label prototypes error: {str(e)}")
+    return CATEGORY_LABELS
+
+def categorizer_source_id():
+    # The embedding categorizer's output changes with its prototypes file
+    if CATEGORIZATION_MODEL == "embedding":
+        try:
+            return f"embedding:{EMBEDDING_MODEL_ID}:{prototypes_fingerprint(LABEL_PROTOTYPES_PATH)}"
+        except Exception as e:
+            print(f"Label prototypes error: {str(e)}")
+            return f"embedding:{EMBEDDING_MODEL_ID}:unavailable"
+    return CATEGORIZER_SOURCE_ID
+
+# Categorizer outputs by normalized review text, kept across requests and
+# restarts; a new model or label set starts from an empty namespace.
+# INFERENCE_CACHE_PATH="" keeps the in-memory tier only.
+INFERENCE_CACHE_PATH = os.getenv("INFERENCE_CACHE_PATH", os.path.join(BACKEND_DIR, "inference_cache.db"))
+try:
+    inference_cache = InferenceCache(
+        INFERENCE_CACHE_PATH or None,
+        cache_namespace(categorizer_source_id(), category_labels()),
+        max_memory_entries=int(os.getenv("INFERENCE_CACHE_MEMORY_ENTRIES", "50000")),
+        max_disk_entries=int(os.getenv("INFERENCE_CACHE_DISK_ENTRIES", "1000000"))
+    )
+except Exception as e:
+    print(f"Inference cache error: {str(e)}")
+    inference_cache = None
+# Fast TF-IDF/NaiveBayes tier in front of the zero-shot model. Reviews it
+# classifies below the confidence threshold are left to BART. Off unless
+# FAST_CATEGORIZER_THRESHOLD is set; pick it with `python fast_categorizer.py`
+# on held-out data (the shipped model routes nothing at any useful threshold)
+FAST_CATEGORIZER_THRESHOLD = os.getenv("FAST_CATEGORIZER_THRESHOLD")
+FAST_CATEGORIZER_THRESHOLD = float(FAST_CATEGORIZER_THRESHOLD) if FAST_CATEGORIZER_THRESHOLD else None
+# Reviews no cheaper tier can categorize are sampled for BART in seeded rounds,
+# stratified by sentiment and month, until every category's 95% interval is
+# within CATEGORY_CI_TARGET percentage points, the latency budget runs out
+# or ZERO_SHOT_BUDGET reviews have been classified (see sampling.py)
+ZERO_SHOT_BUDGET = int(os.getenv("ZERO_SHOT_BUDGET", "500"))
+CATEGORY_CI_TARGET = float(os.getenv("CATEGORY_CI_TARGET", "5"))
+CATEGORY_LATENCY_BUDGET = float(os.getenv("CATEGORY_LATENCY_BUDGET", "10"))
+SAMPLING_ROUND_SIZE = int(os.getenv("SAMPLING_ROUND_SIZE", "16"))
+SAMPLING_SEED = os.getenv("SAMPLING_SEED", "0")
+# Reviews whose normalized text is identical, or whose estimated character
+# 3-gram Jaccard similarity reaches DEDUP_THRESHOLD, form one cluster and are
+# categorized once; 1 keeps exact duplicates only
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.85"))
+# VADER runs in-process below SENTIMENT_PARALLEL_MIN texts, and on a pool of
+# SENTIMENT_WORKERS processes (default: one per core) from there up
+SENTIMENT_WORKERS = int(os.getenv("SENTIMENT_WORKERS", "0")) or None
+SENTIMENT_PARALLEL_MIN = int(os.getenv("SENTIMENT_PARALLEL_MIN", "5000"))
+SENTIMENT_CHUNK_SIZE = int(os.getenv("SENTIMENT_CHUNK_SIZE", "2000"))
+WARMUP_TEXTS = [
+    "The app crashes every time I open it.",
+    "Please add a dark mode.",
+    "Very slow and laggy after the latest update, takes forever to load anything at all."
+]
+
+def load_vader():
+    return SentimentEngine(
+        workers=SENTIMENT_WORKERS,
+        chunk_size=SENTIMENT_CHUNK_SIZE,
+        parallel_min=SENTIMENT_PARALLEL_MIN
+    )
+
+def configure_torch_threads():
+    import torch
+
+    torch.set_num_threads(TORCH_THREADS)
+    try:
+        # Only allowed before torch runs any inter-op parallel work
+        torch.set_num_interop_threads(TORCH_INTEROP_THREADS)
+    except RuntimeError as e:
+        print(f"Torch thread configuration error: {str(e)}")
+
+def load_zero_shot():
+    # transformers/torch are imported here so startup doesn't pay for them
+    import torch
+    from transformers import AutoConfig
+    from zero_shot import build_zero_shot_classifier
+
+    config = AutoConfig.from_pretrained(CATEGORIZATION_MODEL_ID)
     config.label2id = {
         "Feature Requests": 0,
         "Bugs": 1,
@@ -34,16 +256,92 @@ try:
     }
     config.id2label = {v: k for k, v in config.label2id.items()}
     
-    categorization_model = pipeline(
-        "zero-shot-classification",
-        model="facebook/bart-large-mnli",
+    return build_zero_shot_classifier(
+        CATEGORIZATION_MODEL_ID,
+        backend=ZERO_SHOT_BACKEND,
         config=config,
         device=0 if torch.cuda.is_available() else -1,
+        max_length=ZERO_SHOT_MAX_LENGTH,
         batch_size=2048
     )
+
+def load_fine_tuned():
+    import torch
+    from text_classifier import FineTunedClassifier
+
+    return FineTunedClassifier(
+        FINE_TUNED_MODEL_DIR,
+        device=0 if torch.cuda.is_available() else -1,
+        max_length=ZERO_SHOT_MAX_LENGTH
+    )
+
+def load_embedding_categorizer():
+    import torch
+    from embedding_categorizer import EmbeddingCategorizer, SentenceEncoder
+
+    encoder = SentenceEncoder(EMBEDDING_MODEL_ID, device=0 if torch.cuda.is_available() else -1)
+    return EmbeddingCategorizer(encoder, LABEL_PROTOTYPES_PATH)
+
+def load_categorizer():
+    if CATEGORIZATION_MODEL == "fine-tuned":
+        categorization_model = load_fine_tuned()
+    elif CATEGORIZATION_MODEL == "embedding":
+        categorization_model = load_embedding_categorizer()
+    else:
+        categorization_model = load_zero_shot()
+    # However many requests are in flight, only INFERENCE_CONCURRENCY model
+    # calls share the torch threads at a time
+    categorization_model = InferenceLimiter(categorization_model, INFERENCE_CONCURRENCY)
+    # Route every request's classification work through one shared batching queue
+    if INFERENCE_MAX_BATCH > 1:
+        categorization_model = MicroBatcher(
+            categorization_model,
+            max_batch_size=INFERENCE_MAX_BATCH,
+            max_wait_ms=INFERENCE_MAX_WAIT_MS,
+            on_batch=model_batch_size.observe
+        )
+    return categorization_model
+
+def load_fast_categorizer():
+    return FastCategorizer(
+        os.path.join(PROJECT_ROOT, "vectorizer.pkl"),
+        os.path.join(PROJECT_ROOT, "categorization_model.pkl"),
+        CATEGORY_LABELS
+    )
+
+def warm_categorizer(model):
+    # A dummy batch with mixed lengths pays the one-time allocation and
+    # kernel selection costs before the first real request arrives. Runs in
+    # the process that serves requests, so the torch thread pool is sized
+    # (and started) there, never in a gunicorn parent that forks afterwards.
+    configure_torch_threads()
+    classify = model.classify if isinstance(model, MicroBatcher) else model
+    classify(WARMUP_TEXTS, category_labels(), multi_label=False, batch_size=len(WARMUP_TEXTS))
+
+models = ModelRegistry()
+models.register("vader", load_vader, warmup=lambda model: model.score_many(WARMUP_TEXTS))
+models.register("categorizer", load_categorizer, warmup=warm_categorizer)
+if FAST_CATEGORIZER_THRESHOLD is not None:
+    models.register("fast_categorizer", load_fast_categorizer, warmup=lambda model: model.predict(WARMUP_TEXTS), required=False)
+
+def get_fast_categorizer():
+    # None while the fast tier is off
+    return models.get("fast_categorizer") if FAST_CATEGORIZER_THRESHOLD is not None else None
+
+# Keyword overrides shared by every categorization stage
+KEYWORD_RULES_PATH = os.getenv("KEYWORD_RULES_PATH", os.path.join(BACKEND_DIR, "keyword_rules.json"))
+try:
+    keyword_rules = KeywordRules.from_file(KEYWORD_RULES_PATH)
 except Exception as e:
-    print(f"Model loading error: {str(e)}")
-    categorization_model = None
+    print(f"Keyword rules loading error: {str(e)}")
+    keyword_rules = KeywordRules([])
+
+def category_source_id():
+    # Tag stored with each category so a change of models or routing invalidates it
+    source_id = categorizer_source_id()
+    if get_fast_categorizer():
+        source_id = f"cascade:{FAST_CATEGORIZER_THRESHOLD}:{source_id}"
+    return f"{source_id}:rules-{keyword_rules.fingerprint}"
 
 # Predefined solutions based on categories
 predefined_solutions = {
@@ -93,219 +391,537 @@ def extract_app_id(url):
         print(f"URL parsing error: {str(e)}")
         return None
 
-def get_reviews(app_id):
+def scrape_reviews(app_id, count=INITIAL_REVIEW_COUNT):
     try:
-        result, _ = reviews(
-            app_id,
-            lang="en",
-            country="us",
-            count=1000
+        result = scraper.fetch_reviews(app_id, locales=SCRAPER_LOCALES, budget=count)
+        return ReviewBatch.from_records(
+            [{"content": review["content"], "at": review.get("at")} for review in result],
+            category_labels()
         )
-        return [
-            {
-                "content": review["content"],
-                "date": review["at"].strftime("%Y-%m-%d") if "at" in review else "N/A"
-            }
-            for review in result
-        ]
     except Exception as e:
         print(f"Scraper error: {str(e)}")
-        return []
+        return ReviewBatch.from_records([], category_labels())
+
+def fetch_new_reviews(app_id):
+    # Page through newest-first reviews until we reach one that is already stored
+    budget = INITIAL_REVIEW_COUNT if review_store.latest_at(app_id) is None else REVIEW_HISTORY_LIMIT
+    fetched = scraper.fetch_reviews(
+        app_id,
+        locales=SCRAPER_LOCALES,
+        budget=budget,
+        known_ids=lambda review_ids: review_store.known_ids(app_id, review_ids)
+    )
+    return ReviewBatch.from_records(
+        [
+            {"review_id": review["reviewId"], "content": review["content"], "at": review.get("at")}
+            for review in fetched
+        ],
+        category_labels()
+    )
 
-def get_sentiment_label(review_content):
+def get_reviews(app_id):
+    if not review_store:
+        return scrape_reviews(app_id)
     try:
-        vader_scores = vader_analyzer.polarity_scores(review_content)
-        compound_score = vader_scores['compound']
-        
-        if compound_score >= 0.5:
-            return 'Delighted'
-        elif compound_score >= 0.1:
-            return 'Happy'
-        elif compound_score <= -0.5:
-            return 'Angry'
-        elif compound_score <= -0.1:
-            return 'Frustrated'
-        else:
-            return 'Neutral'
+        with stage_timer.stage("scrape"):
+            new_reviews = fetch_new_reviews(app_id)
+        with stage_timer.stage("sentiment"):
+            enrich_reviews(new_reviews)
+        with stage_timer.stage("store"):
+            review_store.add_reviews(app_id, new_reviews)
+            return review_store.load_reviews(app_id, category_source_id(), category_labels(), limit=REVIEW_HISTORY_LIMIT)
+    except Exception as e:
+        print(f"Review store error: {str(e)}")
+        return scrape_reviews(app_id)
+
+def save_review_categories(app_id, categories):
+    if not review_store or not app_id or not categories:
+        return
+    try:
+        review_store.save_categories(app_id, categories, category_source_id())
     except Exception as e:
-        print(f"Sentiment analysis error: {str(e)}")
-        return 'Neutral'
+        print(f"Review store error: {str(e)}")
+
+def enrich_reviews(reviews):
+    # Annotate every review of the batch once so later stages never re-run
+    # VADER. Near-duplicates are clustered (the cluster column holds the
+    # position of the representative in this batch) to share one category.
+    # VADER depends on case, punctuation and emoticons, so only reviews with
+    # identical text share a score; VADER runs once per distinct text.
+    reviews.cluster = cluster_texts(reviews.text, threshold=DEDUP_THRESHOLD)
+    missing = np.flatnonzero(np.isnan(reviews.compound))
+    if len(missing):
+        distinct, inverse = np.unique(reviews.text[missing], return_inverse=True)
+        scores = models.get("vader").score_many(distinct.tolist())
+        reviews.compound[missing] = scores[inverse]
+        reviews.sentiment[missing] = sentiment_codes(scores)[inverse]
+    reviews.text_lower = np.array([text.lower() for text in reviews.text], dtype=object)
+    return reviews
 
 def analyze_sentiment(reviews):
-    sentiment_counts = defaultdict(int)
-    for review in reviews:
-        label = get_sentiment_label(review["content"])
-        sentiment_counts[label] += 1
-    return dict(sentiment_counts)
-
-def categorize_feedback(reviews):
-    if not categorization_model:
-        return {
-            "Feature Requests": 0,
-            "Bugs": 0,
-            "UX/UI": 0,
-            "Navigation Issues": 0,
-            "Performance": 0,
-            "Others": 0
-        }
-    
-    candidate_labels = [
-        "Feature Requests",
-        "Bugs",
-        "UX/UI",
-        "Navigation Issues",
-        "Performance",
-        "Others"
+    counts = np.bincount(reviews.sentiment[reviews.sentiment >= 0], minlength=len(SENTIMENT_LABELS))
+    return {label: int(count) for label, count in zip(SENTIMENT_LABELS, counts) if count}
+
+def analyze_trends(reviews):
+    days = reviews.date
+    valid = ~np.isnat(days)
+    return calculate_all_trends(days[valid].astype(np.int64), reviews.sentiment[valid].astype(np.int64))
+
+def report_progress(progress, stage, **info):
+    if progress:
+        progress(stage, **info)
+
+def match_rules(texts_lower, labels):
+    # Keyword rules for categories outside the current label set are ignored
+    return [
+        rule if rule and rule["category"] in labels else None
+        for rule in keyword_rules.match_many(texts_lower)
     ]
-    texts = [review["content"] for review in reviews]
-    
-    # Sample if too many reviews to speed up
-    if len(texts) > 50:
-        import random
-        # Use a fixed seed for reproducibility if needed, or just random
-        sampled_indices = random.sample(range(len(texts)), 50)
-        texts_to_process = [texts[i] for i in sampled_indices]
-    else:
-        texts_to_process = texts
-        sampled_indices = range(len(texts))
+
+def route_categories(reviews, fast_categorizer, categorization_model):
+    # Categorizes what the store, the keyword rules and the fast tier can, and
+    # leaves the rest as uncertain reviews for the zero-shot model
+    labels = reviews.category_labels
+    routing = {"stored": 0, "rules": 0, "fast": 0, "zero_shot": 0, "unrouted": 0}
     
-    results = categorization_model(
-        texts_to_process,
-        candidate_labels,
-        multi_label=False,
-        batch_size=8 # Smaller batch size for CPU
-    )
+    # Reviews already categorized by this model in the review store skip inference
+    stored = reviews.category != NO_CODE
+    known = dict(zip(np.flatnonzero(stored).tolist(), reviews[stored].category_names()))
+    pending = np.flatnonzero(~stored).tolist()
+    routing["stored"] = len(known)
     
-    categories = defaultdict(int)
-    total_processed = len(texts_to_process)
+    # Keyword rules run over the whole batch in one pass; strong matches skip the models
+    rule_matches = dict(zip(pending, match_rules(reviews.text_lower[pending].tolist(), labels)))
+    new_categories = {}
+    model_pending = []
+    for idx in pending:
+        if keyword_rules.skips_model(rule_matches[idx]):
+            new_categories[idx] = rule_matches[idx]["category"]
+        else:
+            model_pending.append(idx)
+    routing["rules"] = len(new_categories)
     
-    for i, idx in enumerate(sampled_indices):
-        scores = results[i]['scores']
-        labels = results[i]['labels']
-        max_score_index = scores.index(max(scores))
-        category = labels[max_score_index]
-        
-        # Post-processing logic to handle specific keywords
-        content_lower = texts_to_process[i].lower()
-        if "opened not able to go back" in content_lower or "force exit" in content_lower:
-            category = "Bugs"
-        elif "not working" in content_lower or "crash" in content_lower or "nonresponsive" in content_lower:
-            category = "Bugs"
-        elif "performance issue" in content_lower or "lag" in content_lower or "slow" in content_lower:
-            category = "Performance"
-        elif "ux" in content_lower or "ui" in content_lower or "interface" in content_lower:
-            category = "UX/UI"
-        elif "navigation" in content_lower or "go back" in content_lower or "exit" in content_lower:
-            category = "Navigation Issues"
-        
-        categories[category] += 1
+    uncertain = model_pending
+    if fast_categorizer and model_pending:
+        fast_labels, confidences = fast_categorizer.predict(reviews.text[model_pending].tolist())
+        uncertain = []
+        for idx, label, confidence in zip(model_pending, fast_labels, confidences):
+            # The fast tier only knows the built-in labels
+            if confidence >= FAST_CATEGORIZER_THRESHOLD and label in labels:
+                # Keyword rules override the model's choice
+                rule = rule_matches[idx]
+                new_categories[idx] = rule["category"] if rule else label
+            else:
+                uncertain.append(idx)
+        routing["fast"] = len(model_pending) - len(uncertain)
     
-    for category in categories:
-        categories[category] = round((categories[category] / total_processed) * 100, 2) if total_processed > 0 else 0
+    # Near-duplicates share one zero-shot call: each unit is a cluster's
+    # uncertain reviews, classified through its first member
+    units = {}
+    clusters = reviews.cluster.tolist()
+    for idx in uncertain:
+        units.setdefault(clusters[idx], []).append(idx)
     
-    return dict(categories)
+    return {
+        "routing": routing,
+        "known": known,
+        "new_categories": new_categories,
+        "rule_matches": rule_matches,
+        "units": list(units.values())
+    }
 
-def calculate_sentiment_trends(reviews, period="1y"):
-    from collections import defaultdict, OrderedDict
-    from datetime import datetime, timedelta
-    import math
-    
-    trends = defaultdict(lambda: {
-        "Delighted": 0,
-        "Happy": 0,
-        "Neutral": 0,
-        "Frustrated": 0,
-        "Angry": 0
-    })
-    
-    cutoff = datetime.now()
-    
-    # Determine grouping strategy based on period
-    if period == "1y":
-        cutoff -= timedelta(days=365)
-        group_by = "month"  # 12 bars (one per month)
-    elif period == "6m":
-        cutoff -= timedelta(days=180)
-        group_by = "month"  # 6 bars (one per month)
-    elif period == "3m":
-        cutoff -= timedelta(days=90)
-        group_by = "biweekly"  # 6 bars (2-week intervals)
-    elif period == "1m":
-        cutoff -= timedelta(days=30)
-        group_by = "week"  # 4 bars (one per week)
-    elif period == "1w":
-        cutoff -= timedelta(days=7)
-        group_by = "day"  # 7 bars (one per day)
+def classify_texts(categorization_model, texts, labels, progress=None):
+    # Texts the inference cache has seen (under the same model and labels)
+    # skip the model, and so do repeats within texts
+    if inference_cache:
+        inference_cache.use_namespace(cache_namespace(categorizer_source_id(), labels))
+    keys = [inference_cache.key(text) for text in texts] if inference_cache else list(texts)
+    cached = [None] * len(texts)
+    if inference_cache:
+        try:
+            cached = inference_cache.get_many(keys)
+        except Exception as e:
+            print(f"Inference cache error: {str(e)}")
+    pending = {}
+    for key, text, result in zip(keys, texts, cached):
+        if result is None:
+            pending.setdefault(key, text)
+    computed = {
+        key: {"labels": result["labels"], "scores": result["scores"]}
+        for key, result in zip(pending, run_classifier(categorization_model, list(pending.values()), labels, progress))
+    }
+    if inference_cache and computed:
+        try:
+            inference_cache.put_many(list(computed), list(computed.values()))
+        except Exception as e:
+            print(f"Inference cache error: {str(e)}")
+    return [
+        {"sequence": text, **(result if result is not None else computed[key])}
+        for key, text, result in zip(keys, texts, cached)
+    ]
+
+def run_classifier(categorization_model, texts, labels, progress=None):
+    results = []
+    report_progress(progress, "categorize", done=0, total=len(texts))
+    # Run in batch-sized chunks so job progress can report "categorized M of K"
+    chunks = [
+        texts[start:start + CATEGORIZE_CHUNK_SIZE]
+        for start in range(0, len(texts), CATEGORIZE_CHUNK_SIZE)
+    ]
+    if isinstance(categorization_model, MicroBatcher):
+        # Queue every chunk up front so they can share batches with other requests
+        futures = [categorization_model.submit(chunk, labels) for chunk in chunks]
+        chunk_results = (future.result() for future in futures)
     else:
-        cutoff -= timedelta(days=365)
-        group_by = "month"
+        chunk_results = (
+            categorization_model(
+                chunk,
+                labels,
+                multi_label=False,
+                batch_size=8 # Smaller batch size for CPU
+            )
+            for chunk in chunks
+        )
+        for chunk in chunks:
+            model_batch_size.observe(len(chunk))
+    for chunk_result in chunk_results:
+        results.extend(chunk_result)
+        report_progress(progress, "categorize", done=len(results), total=len(texts))
+    return results
+
+def sampling_strata(reviews, positions):
+    # (sentiment, "YYYY-MM") per position; the month is "N/A" without a date
+    sampled = reviews[np.asarray(positions, dtype=np.int64)]
+    return list(zip(sampled.sentiment_labels(), sampled.month_strings().tolist()))
+
+def sampling_seed(app_id):
+    # Stable across processes, unlike hash()
+    return zlib.crc32(f"{SAMPLING_SEED}:{app_id}".encode())
+
+def categorize_feedback_many(groups, progress=None):
+    # groups is a list of (app_id, reviews). Returns one
+    # (percentages, routing, intervals) per group. Each sampling round pools
+    # the reviews drawn for every group so they share inference batches.
+    categorization_model = models.get("categorizer")
+    fast_categorizer = get_fast_categorizer()
+    # One label set for every group, even if the prototypes file changed
+    # between their scrapes
+    labels = category_labels()
+    for _, reviews in groups:
+        reviews.relabel(labels)
+    if not categorization_model and not fast_categorizer:
+        return [
+            (
+                {label: 0 for label in labels},
+                {"stored": 0, "rules": 0, "fast": 0, "zero_shot": 0, "unrouted": 0},
+                {}
+            )
+            for _ in groups
+        ]
     
-    # Track dates for proper ordering
-    date_mapping = {}
+    plans = [route_categories(reviews, fast_categorizer, categorization_model) for _, reviews in groups]
+    estimators = []
+    for (app_id, reviews), plan in zip(groups, plans):
+        known_counts = defaultdict(int)
+        for category in list(plan["known"].values()) + list(plan["new_categories"].values()):
+            known_counts[category] += 1
+        estimators.append(AdaptiveEstimator(
+            labels,
+            known_counts,
+            sampling_strata(reviews, [members[0] for members in plan["units"]]),
+            seed=sampling_seed(app_id),
+            round_size=SAMPLING_ROUND_SIZE,
+            ci_target=CATEGORY_CI_TARGET,
+            max_samples=ZERO_SHOT_BUDGET if categorization_model else 0,
+            weights=[len(members) for members in plan["units"]]
+        ))
     
-    for review in reviews:
-        date_str = review["date"]
-        if date_str == "N/A":
-            continue
+    deadline = time.monotonic() + CATEGORY_LATENCY_BUDGET
+    total = sum(estimator.max_samples for estimator in estimators)
+    done = 0
+    report_progress(progress, "categorize", done=done, total=total)
+    # Rounds stop starting once the latency budget is spent
+    while time.monotonic() < deadline:
+        draws = [(group, estimator.next_round()) for group, estimator in enumerate(estimators)]
+        draws = [(group, positions) for group, positions in draws if positions]
+        if not draws:
+            break
+        texts = [
+            groups[group][1].text[plans[group]["units"][position][0]]
+            for group, positions in draws
+            for position in positions
+        ]
+        results = iter(classify_texts(categorization_model, texts, labels))
+        for group, positions in draws:
+            plan = plans[group]
+            drawn = []
+            for position in positions:
+                result = next(results)
+                scores = result['scores']
+                max_score_index = scores.index(max(scores))
+                members = plan["units"][position]
+                for idx in members:
+                    # Keyword rules override the model's choice
+                    rule = plan["rule_matches"][idx]
+                    category = rule["category"] if rule else result['labels'][max_score_index]
+                    plan["new_categories"][idx] = category
+                drawn.append(plan["new_categories"][members[0]])
+            estimators[group].add(positions, drawn)
+        done += len(texts)
+        report_progress(progress, "categorize", done=done, total=total)
+    
+    outcomes = []
+    for (app_id, reviews), plan, estimator in zip(groups, plans, estimators):
+        positions = list(plan["new_categories"])
+        categories = list(plan["new_categories"].values())
+        reviews.set_categories(positions, categories)
+        new_categories = {
+            review_id: category
+            for review_id, category in zip(reviews.review_id[positions].tolist(), categories)
+            if review_id is not None
+        }
+        save_review_categories(app_id, new_categories)
         
+        routing = plan["routing"]
+        routing["zero_shot"] = estimator.covered
+        routing["zero_shot_calls"] = estimator.sampled
+        routing["unrouted"] = estimator.population - estimator.covered
+        routing["rounds"] = estimator.rounds
+        routing["stopped"] = estimator.stop_reason()
+        percentages, intervals = estimator.estimate()
+        outcomes.append((percentages, routing, intervals))
+    return outcomes
+
+def categorize_feedback(reviews, app_id=None, progress=None):
+    return categorize_feedback_many([(app_id, reviews)], progress)[0]
+
+def get_random_solution(category):
+    solutions = predefined_solutions.get(category)
+    if not solutions and CATEGORIZATION_MODEL == "embedding":
+        # Labels added to the prototypes file can bring their own solutions
         try:
-            review_date = datetime.strptime(date_str, "%Y-%m-%d")
-        except:
-            continue
-            
-        if review_date < cutoff:
-            continue
+            solutions = read_prototypes(LABEL_PROTOTYPES_PATH)[1].get(category, {}).get("solutions")
+        except Exception as e:
+            print(f"Label prototypes error: {str(e)}")
+    return random.choice(solutions or ["N/A"])
+
+def top_complaints(reviews, limit=10):
+    # Positions of the newest review of each of the largest clusters of
+    # non-positive reviews, with the cluster sizes; ties keep newest-first order
+    positions = np.flatnonzero(~np.isin(reviews.sentiment, [SENTIMENT_CODES["Delighted"], SENTIMENT_CODES["Happy"]]))
+    _, first, sizes = np.unique(reviews.cluster[positions], return_index=True, return_counts=True)
+    largest = np.lexsort((first, -sizes))[:limit]
+    return positions[first[largest]].tolist(), sizes[largest].tolist()
+
+def build_feedback(reviews, app_id=None):
+    categorized_feedback = []
+    categorization_model = models.get("categorizer")
+    feedback_samples, cluster_sizes = top_complaints(reviews)
+    if categorization_model:
         
-        # Group based on strategy
-        if group_by == "month":
-            # Monthly grouping
-            date_key = review_date.strftime("%b")
-            sort_key = review_date.strftime("%Y-%m")
-        elif group_by == "biweekly":
-            # Bi-weekly grouping (2-week intervals)
-            # Calculate which 2-week period this falls into
-            days_since_cutoff = (review_date - cutoff).days
-            period_num = min(days_since_cutoff // 14, 5)  # 0-5 for 6 periods
-            week_start = cutoff + timedelta(days=period_num * 14)
-            week_end = week_start + timedelta(days=13)
-            date_key = f"{week_start.strftime('%d %b')}-{week_end.strftime('%d %b')}"
-            sort_key = week_start.strftime("%Y-%m-%d")
-        elif group_by == "week":
-            # Weekly grouping (4 weeks in a month)
-            days_since_cutoff = (review_date - cutoff).days
-            week_num = min(days_since_cutoff // 7, 3)  # 0-3 for 4 weeks
-            date_key = f"Week {week_num + 1}"
-            sort_key = f"{week_num:02d}"
-        elif group_by == "day":
-            # Daily grouping (7 days)
-            date_key = review_date.strftime("%a")  # Mon, Tue, Wed, etc.
-            sort_key = review_date.strftime("%Y-%m-%d")
-        else:
-            date_key = review_date.strftime("%Y-%m-%d")
-            sort_key = date_key
+        # Samples already categorized (in the store or by categorize_feedback) skip
+        # inference, and so do samples a strong keyword rule decides
+        new_categories = {}
+        pending_samples = []
+        sample_rules = match_rules(reviews.text_lower[feedback_samples].tolist(), reviews.category_labels)
+        for position, rule in zip(feedback_samples, sample_rules):
+            if reviews.category[position] != NO_CODE:
+                continue
+            if keyword_rules.skips_model(rule):
+                reviews.set_categories([position], [rule["category"]])
+                if reviews.review_id[position] is not None:
+                    new_categories[reviews.review_id[position]] = rule["category"]
+            else:
+                pending_samples.append((position, rule))
+        sample_results = []
+        if pending_samples:
+            sample_results = classify_texts(
+                categorization_model,
+                reviews.text[[position for position, _ in pending_samples]].tolist(),
+                reviews.category_labels
+            )
         
-        # Store mapping for sorting
-        if date_key not in date_mapping:
-            date_mapping[date_key] = sort_key
+        for (position, rule), result in zip(pending_samples, sample_results):
+            scores = result['scores']
+            labels = result['labels']
+            max_score_index = scores.index(max(scores))
+            # Keyword rules override the model's choice
+            category = rule["category"] if rule else labels[max_score_index]
+            
+            reviews.set_categories([position], [category])
+            if reviews.review_id[position] is not None:
+                new_categories[reviews.review_id[position]] = category
+        save_review_categories(app_id, new_categories)
         
-        label = get_sentiment_label(review["content"])
-        trends[date_key][label] += 1
+        for position, count in zip(feedback_samples, cluster_sizes):
+            review = reviews.record(position)
+            category = review["category"]
+            review_sentiment = review["sentiment"]
+            
+            # Get random predefined solution
+            solution = get_random_solution(category)
+            
+            categorized_feedback.append({
+                "content": review["content"],
+                "category": category,
+                "sentiment": review_sentiment,
+                "solution": solution,
+                "count": count
+            })
+    else:
+        categorized_feedback = [
+            {
+                "content": review["content"],
+                "category": "N/A",
+                "sentiment": review["sentiment"],
+                "solution": "Model not found",
+                "count": count
+            }
+            for review, count in zip(map(reviews.record, feedback_samples), cluster_sizes)
+        ]
     
-    # Sort by actual date order
-    sorted_trends = OrderedDict(
-        sorted(trends.items(), key=lambda x: date_mapping.get(x[0], x[0]))
-    )
+    return categorized_feedback
+
+def iter_analysis(app_id, period, progress=None):
+    # Yields (stage, partial payload) as each stage of the pipeline finishes
+    # Fetch app details and reviews concurrently
+    report_progress(progress, "metadata", status="running")
+    details_future = scraper.submit_app_details(app_id, lang='en', country='us')
+    # Run in a copy of this context so the scrape stages are timed for this request
+    reviews_future = scraper.coordinator.submit(contextvars.copy_context().run, get_reviews, app_id)
+    with stage_timer.stage("metadata"):
+        app_details = details_future.result()
+    app_name = app_details.get('title', 'Unknown App')
+    playstore_category = app_details.get('genre', 'Unknown Category')
+    report_progress(progress, "metadata", status="done")
+    yield "app", {
+        "app_name": app_name,
+        "category": playstore_category,
+        "icon": app_details.get('icon', '')
+    }
+
+    report_progress(progress, "scrape", status="running", reviews=0)
+    reviews = reviews_future.result()
+    reviews_processed.inc(len(reviews))
+    report_progress(progress, "scrape", status="done", reviews=len(reviews))
+    if not reviews:
+        yield "error", {
+            "error": "No reviews found",
+            "sentiment": {
+                "Delighted": 0,
+                "Happy": 0,
+                "Neutral": 0,
+                "Frustrated": 0,
+                "Angry": 0
+            },
+            "categories": {
+                "Feature Requests": 0,
+                "Bugs": 0,
+                "UX/UI": 0,
+                "Navigation Issues": 0,
+                "Performance": 0,
+                "Others": 0
+            },
+            "trends": {},
+            "feedback": []
+        }
+        return
+
+    with stage_timer.stage("sentiment"):
+        # Annotate reviews with sentiment, parsed date and lowercased text once
+        enrich_reviews(reviews)
+
+        # Calculate sentiment
+        sentiment = analyze_sentiment(reviews)
+    report_progress(progress, "sentiment", status="done", reviews=len(reviews))
+    yield "sentiment", {"sentiment": sentiment}
+    
+    # Calculate trends
+    with stage_timer.stage("trends"):
+        trends_by_period = analyze_trends(reviews)
+    report_progress(progress, "trends", status="done")
+    yield "trends", {
+        "trends": trends_by_period.get(period, trends_by_period[DEFAULT_PERIOD]),
+        "trends_by_period": trends_by_period
+    }
     
-    return dict(sorted_trends)
+    # Categorize feedback (batch processing)
+    with stage_timer.stage("categorization"):
+        categories, routing, intervals = categorize_feedback(reviews, app_id, progress)
+    yield "categories", {"categories": categories, "category_intervals": intervals, "categorization": routing}
+    
+    # Prepare feedback samples with filtering
+    with stage_timer.stage("feedback"):
+        categorized_feedback = build_feedback(reviews, app_id)
+    
+    report_progress(progress, "feedback", status="done", samples=len(categorized_feedback))
+    yield "feedback", {"feedback": categorized_feedback}
 
-def get_random_solution(category):
-    return random.choice(predefined_solutions.get(category, ["N/A"]))
+def run_analysis(app_id, period, progress=None):
+    payload = {}
+    for stage, data in iter_analysis(app_id, period, progress):
+        if stage == "error":
+            return data, 404
+        payload.update(data)
+    return payload, 200
+
+@app.before_request
+def start_request_timing():
+    g.request_start = time.perf_counter()
+    stage_timer.start_request()
+    g.profiler = None
+    wants_profile = request.headers.get('X-Profile') == '1' or request.args.get('profile') == '1'
+    if PROFILING_ENABLED and wants_profile:
+        # cProfile only sees this thread; scraping on the pool threads shows
+        # up as time spent waiting on futures
+        try:
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+        except Exception as e:
+            print(f"Profiler error: {str(e)}")
+            g.profiler = None
+
+@app.after_request
+def finish_request_timing(response):
+    elapsed = time.perf_counter() - g.get('request_start', time.perf_counter())
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    request_seconds.observe(elapsed, endpoint=endpoint, status=response.status_code)
+    stages = stage_timer.finish_request()
+    timing = server_timing(stages + [("total", elapsed)])
+    response.headers['Server-Timing'] = timing
+    # Lets the frontend's devtools show the timings across origins
+    response.headers['Timing-Allow-Origin'] = '*'
+    if g.get('profiler'):
+        g.profiler.disable()
+        response.headers['X-Profile-File'] = save_profile(g.profiler, endpoint)
+        g.profiler = None
+    return response
+
+def save_profile(profiler, endpoint):
+    # Writes the raw stats for snakeviz/pstats and logs the top functions
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{endpoint.strip('/').replace('/', '_') or 'root'}-{os.getpid()}.prof"
+    path = os.path.join(PROFILE_DIR, name)
+    profiler.dump_stats(path)
+    summary = io.StringIO()
+    pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(20)
+    print(summary.getvalue())
+    return name
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(result_cache.stats())
 
 @app.route('/analyze', methods=['POST'])
 def analyze():
     try:
         app_url = request.json.get('url', '')
         period = request.json.get('period', '1y')
+        include_reviews = request.json.get('reviews') is True
         
         if not app_url:
             return jsonify({"error": "No URL provided"}), 400
@@ -314,128 +930,15 @@ def analyze():
         if not app_id:
             return jsonify({"error": "Invalid URL"}), 400
 
-        # Fetch app details
-        app_details = play_store_app(
-            app_id,
-            lang='en',
-            country='us'
-        )
-        app_name = app_details.get('title', 'Unknown App')
-        playstore_category = app_details.get('genre', 'Unknown Category')
-
-        reviews = get_reviews(app_id)
-        if not reviews:
-            return jsonify({
-                "error": "No reviews found",
-                "sentiment": {
-                    "Delighted": 0,
-                    "Happy": 0,
-                    "Neutral": 0,
-                    "Frustrated": 0,
-                    "Angry": 0
-                },
-                "categories": {
-                    "Feature Requests": 0,
-                    "Bugs": 0,
-                    "UX/UI": 0,
-                    "Navigation Issues": 0,
-                    "Performance": 0,
-                    "Others": 0
-                },
-                "trends": {},
-                "feedback": []
-            }), 404
-
-        # Calculate sentiment
-        sentiment = analyze_sentiment(reviews)
-        
-        # Categorize feedback (batch processing)
-        categories = categorize_feedback(reviews)
-        
-        # Calculate trends
-        trends = calculate_sentiment_trends(reviews, period)
-        
-        # Prepare feedback samples with filtering
-        categorized_feedback = []
-        if categorization_model:
-            filtered_reviews = [
-                review for review in reviews 
-                if get_sentiment_label(review["content"]) not in ["Delighted", "Happy"]
-            ]
-            feedback_samples = filtered_reviews[:10]
-            
-            texts_for_samples = [review["content"] for review in feedback_samples]
-            sample_results = categorization_model(
-                texts_for_samples,
-                candidate_labels=[
-                    "Feature Requests",
-                    "Bugs",
-                    "UX/UI",
-                    "Navigation Issues",
-                    "Performance",
-                    "Others"
-                ],
-                multi_label=False,
-                batch_size=10
-            )
-            
-            for i, review in enumerate(feedback_samples):
-                scores = sample_results[i]['scores']
-                labels = sample_results[i]['labels']
-                max_score_index = scores.index(max(scores))
-                category = labels[max_score_index]
-                
-                # Post-processing logic to handle specific keywords
-                content_lower = review["content"].lower()
-                if "opened not able to go back" in content_lower or "force exit" in content_lower:
-                    category = "Bugs"
-                elif "not working" in content_lower or "crash" in content_lower or "nonresponsive" in content_lower:
-                    category = "Bugs"
-                elif "performance issue" in content_lower or "lag" in content_lower or "slow" in content_lower:
-                    category = "Performance"
-                elif "ux" in content_lower or "ui" in content_lower or "interface" in content_lower:
-                    category = "UX/UI"
-                elif "navigation" in content_lower or "go back" in content_lower or "exit" in content_lower:
-                    category = "Navigation Issues"
-                
-                review_sentiment = get_sentiment_label(review["content"])
-                
-                # Get random predefined solution
-                solution = get_random_solution(category)
-                
-                categorized_feedback.append({
-                    "content": review["content"],
-                    "category": category,
-                    "sentiment": review_sentiment,
-                    "solution": solution,
-                    "count": 1
-                })
-        else:
-            filtered_reviews = [
-                review for review in reviews 
-                if get_sentiment_label(review["content"]) not in ["Delighted", "Happy"]
-            ]
-            feedback_samples = filtered_reviews[:10]
-            categorized_feedback = [
-                {
-                    "content": review["content"],
-                    "category": "N/A",
-                    "sentiment": get_sentiment_label(review["content"]),
-                    "solution": "Model not found",
-                    "count": 1
-                }
-                for review in feedback_samples
-            ]
-        
-        return jsonify({
-            "sentiment": sentiment,
-            "categories": categories,
-            "trends": trends,
-            "feedback": categorized_feedback,
-            "app_name": app_name,
-            "category": playstore_category,
-            "icon": app_details.get('icon', '')
-        })
+        payload, status = run_cached_analysis(app_id, period)
+        with stage_timer.stage("serialization"):
+            if include_reviews and status == 200:
+                response = json_response(encode_with_reviews(payload, review_columns(app_id)))
+            else:
+                response = jsonify(payload)
+        return response, status
+    except Overloaded:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -460,5 +963,468 @@ def analyze():
             "feedback": []
         }), 500
 
+@app.errorhandler(Overloaded)
+def overloaded(e):
+    response = jsonify({"error": f"Server is busy, retry later ({str(e)})"})
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response, e.status
+
+def review_columns(app_id):
+    # The app's stored reviews (the ones its analysis covered), encoded column
+    # by column with ReviewBatch.to_json; "null" without a review store
+    if not review_store:
+        return "null"
+    try:
+        reviews = review_store.load_reviews(app_id, category_source_id(), category_labels(), limit=REVIEW_HISTORY_LIMIT)
+    except Exception as e:
+        print(f"Review store error: {str(e)}")
+        return "null"
+    return reviews.to_json()
+
+def encode_with_reviews(payload, reviews_json):
+    # Encodes payload like jsonify, with the already encoded reviews spliced
+    # in as "reviews" rather than decoded into dicts and encoded again
+    body = app.json.dumps(payload)
+    return f'{body[:-1]}{"," if payload else ""}"reviews":{reviews_json}}}'
+
+def json_response(body):
+    return Response(body + "\n", mimetype='application/json')
+
+def select_period(payload, period):
+    if "trends_by_period" not in payload:
+        return payload
+    trends_by_period = payload["trends_by_period"]
+    return {**payload, "trends": trends_by_period.get(period, trends_by_period[DEFAULT_PERIOD])}
+
+def run_background_analysis(app_id, period):
+    # Stale-entry refreshes run outside any request, so they wait for an
+    # analysis slot like the analyses requests admitted
+    with analysis_gate.slot(block=True):
+        return run_analysis(app_id, period)
+
+def run_admitted_analysis(app_id, period, progress=None, block=False):
+    with analysis_gate.slot(block):
+        return run_analysis(app_id, period, progress)
+
+def run_cached_analysis(app_id, period, progress=None, block=False):
+    # Only the caller that runs the analysis takes an analysis slot; cached
+    # results and callers waiting on an analysis already running don't
+    payload, status = result_cache.get_or_compute(
+        app_id,
+        lambda: run_admitted_analysis(app_id, period, progress, block),
+        cacheable=lambda result: result[1] == 200,
+        refresh=lambda: run_background_analysis(app_id, period)
+    )
+    return select_period(payload, period), status
+
+def run_job_analysis(app_id, period, progress=None):
+    # Jobs were accepted when submitted, so they wait for an analysis slot
+    # rather than failing with 429/503
+    return run_cached_analysis(app_id, period, progress, block=True)
+
+def run_batch_analysis(app_ids, period):
+    # Returns {app_id: (payload, status)}; a failing app only affects its own
+    # entry. Apps share the result cache's single flight with single
+    # analyses. Each app this batch analyzes itself needs an analysis slot,
+    # so they run in waves of as many apps as it holds slots.
+    results = {}
+    waiting = {}
+    owned = {}
+    for app_id in app_ids:
+        state, found = result_cache.claim(
+            app_id,
+            lambda app_id=app_id: run_background_analysis(app_id, period),
+            cacheable=lambda result: result[1] == 200
+        )
+        if state == "cached":
+            results[app_id] = found
+        elif state == "wait":
+            waiting[app_id] = found
+        else:
+            owned[app_id] = found
+
+    if owned:
+        # The first slot is admitted like a single analysis, so an overloaded
+        # server still answers 429/503; more are taken only while they are free
+        try:
+            analysis_gate.acquire()
+        except Overloaded as e:
+            for app_id, future in owned.items():
+                result_cache.settle(app_id, future, error=e)
+            raise
+        slots = 1
+        owners = list(owned)
+        try:
+            while owners:
+                while slots < len(owners) and analysis_gate.try_acquire():
+                    slots += 1
+                while slots > len(owners):
+                    analysis_gate.release()
+                    slots -= 1
+                wave, owners = owners[:slots], owners[slots:]
+                results.update(analyze_apps(wave))
+        finally:
+            for _ in range(slots):
+                analysis_gate.release()
+            for app_id, future in owned.items():
+                if app_id in results:
+                    result_cache.settle(app_id, future, results[app_id], cacheable=lambda result: result[1] == 200)
+                else:
+                    result_cache.settle(app_id, future, error=RuntimeError("Batch analysis failed"))
+
+    for app_id, future in waiting.items():
+        try:
+            results[app_id] = future.result()
+        except Overloaded as e:
+            results[app_id] = ({"error": f"Server is busy, retry later ({str(e)})"}, e.status)
+        except Exception as e:
+            results[app_id] = ({"error": f"Internal server error: {str(e)}"}, 500)
+
+    return {
+        app_id: (select_period(payload, period), status)
+        for app_id, (payload, status) in results.items()
+    }
+
+def analyze_apps(app_ids):
+    # Scrapes every app concurrently, then categorizes all of their reviews in
+    # shared batches. Returns {app_id: (payload, status)} for every app.
+    results = {}
+    fetches = {}
+    for app_id in app_ids:
+        fetches[app_id] = (
+            scraper.submit_app_details(app_id, lang='en', country='us'),
+            scraper.coordinator.submit(contextvars.copy_context().run, get_reviews, app_id)
+        )
+
+    analyzed = []
+    for app_id, (details_future, reviews_future) in fetches.items():
+        try:
+            app_details = details_future.result()
+            reviews = reviews_future.result()
+        except Exception as e:
+            print(f"Batch analysis error for {app_id}: {str(e)}")
+            results[app_id] = ({"error": f"Failed to fetch app: {str(e)}"}, 502)
+            continue
+        if not reviews:
+            results[app_id] = ({"error": "No reviews found"}, 404)
+            continue
+        try:
+            enrich_reviews(reviews)
+            reviews_processed.inc(len(reviews))
+            trends_by_period = analyze_trends(reviews)
+            payload = {
+                "app_name": app_details.get('title', 'Unknown App'),
+                "category": app_details.get('genre', 'Unknown Category'),
+                "icon": app_details.get('icon', ''),
+                "sentiment": analyze_sentiment(reviews),
+                "trends": trends_by_period[DEFAULT_PERIOD],
+                "trends_by_period": trends_by_period
+            }
+        except Exception as e:
+            print(f"Batch analysis error for {app_id}: {str(e)}")
+            results[app_id] = ({"error": f"Internal server error: {str(e)}"}, 500)
+            continue
+        analyzed.append((app_id, reviews, payload))
+
+    try:
+        outcomes = categorize_feedback_many([(app_id, reviews) for app_id, reviews, _ in analyzed])
+    except Exception as e:
+        print(f"Batch categorization error: {str(e)}")
+        outcomes = [e] * len(analyzed)
+
+    for (app_id, reviews, payload), outcome in zip(analyzed, outcomes):
+        try:
+            if isinstance(outcome, Exception):
+                raise outcome
+            payload["categories"], payload["categorization"], payload["category_intervals"] = outcome
+            payload["feedback"] = build_feedback(reviews, app_id)
+        except Exception as e:
+            print(f"Batch analysis error for {app_id}: {str(e)}")
+            results[app_id] = ({"error": f"Internal server error: {str(e)}"}, 500)
+            continue
+        results[app_id] = (payload, 200)
+
+    return results
+
+def compare_results(results):
+    # Side-by-side sentiment and category shares (percent) of the apps that
+    # were analyzed successfully, keyed by label and then app_id
+    comparison = {"apps": {}, "sentiment": {}, "categories": {}}
+    # Cached payloads may predate a change to the label set
+    labels = list(dict.fromkeys(
+        category_labels()
+        + [label for payload, status in results.values() if status == 200 for label in payload["categories"]]
+    ))
+    for label in SENTIMENT_LABELS:
+        comparison["sentiment"][label] = {}
+    for label in labels:
+        comparison["categories"][label] = {}
+    for app_id, (payload, status) in results.items():
+        if status != 200:
+            continue
+        total = sum(payload["sentiment"].values())
+        comparison["apps"][app_id] = {"app_name": payload["app_name"], "reviews": total}
+        for label in SENTIMENT_LABELS:
+            count = payload["sentiment"].get(label, 0)
+            comparison["sentiment"][label][app_id] = round(count / total * 100, 2) if total else 0
+        for label in labels:
+            comparison["categories"][label][app_id] = payload["categories"].get(label, 0)
+    return comparison
+
+@app.route('/analyze/batch', methods=['POST'])
+def analyze_batch():
+    app_urls = request.json.get('urls', [])
+    period = request.json.get('period', '1y')
+    include_reviews = request.json.get('reviews') is True
+
+    if not app_urls or not isinstance(app_urls, list):
+        return jsonify({"error": "No URLs provided"}), 400
+    if len(app_urls) > BATCH_MAX_APPS:
+        return jsonify({"error": f"At most {BATCH_MAX_APPS} apps can be analyzed per batch"}), 400
+
+    parsed = [
+        (app_url, extract_app_id(app_url) if isinstance(app_url, str) else None)
+        for app_url in app_urls
+    ]
+    # Repeated apps are analyzed once
+    app_ids = list(dict.fromkeys(app_id for _, app_id in parsed if app_id))
+
+    try:
+        results = run_batch_analysis(app_ids, period)
+    except Overloaded:
+        raise
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+
+    apps = []
+    for app_url, app_id in parsed:
+        if not app_id:
+            apps.append({"url": app_url, "app_id": None, "status": 400, "error": "Invalid URL"})
+            continue
+        payload, status = results[app_id]
+        apps.append({"url": app_url, "app_id": app_id, "status": status, **payload})
+
+    with stage_timer.stage("serialization"):
+        if not include_reviews:
+            return jsonify({"apps": apps, "comparison": compare_results(results)})
+        columns = {}
+        encoded = []
+        for entry in apps:
+            if entry["status"] != 200:
+                encoded.append(app.json.dumps(entry))
+                continue
+            if entry["app_id"] not in columns:
+                columns[entry["app_id"]] = review_columns(entry["app_id"])
+            encoded.append(encode_with_reviews(entry, columns[entry["app_id"]]))
+        return json_response(
+            f'{{"apps":[{",".join(encoded)}],"comparison":{app.json.dumps(compare_results(results))}}}'
+        )
+
+# Background analysis jobs for clients that can't hold a request open
+job_manager = JobManager(
+    run_job_analysis,
+    max_workers=int(os.getenv("JOB_WORKERS", "2")),
+    max_pending=int(os.getenv("JOB_MAX_PENDING", "16")),
+    ttl_seconds=float(os.getenv("JOB_TTL", "900"))
+)
+
+def inference_queue_depth():
+    model = models.loaded("categorizer")
+    return model.queue_depth() if isinstance(model, MicroBatcher) else 0
+
+def result_cache_counts():
+    stats = result_cache.stats()
+    return {
+        (("result", result),): stats[result]
+        for result in ("hits", "stale_hits", "misses", "waits", "evictions", "refreshes", "errors")
+    }
+
+metrics.callback("queue_depth", "Work waiting to be processed", lambda: {
+    (("queue", "inference"),): inference_queue_depth(),
+    (("queue", "jobs"),): job_manager.pending()
+})
+metrics.callback("result_cache_requests_total", "Result cache lookups by outcome", result_cache_counts, "counter")
+metrics.callback("analysis_slots", "Uncached analyses running or waiting for a slot", lambda: {
+    (("state", "active"),): analysis_gate.stats()["active"],
+    (("state", "queued"),): analysis_gate.stats()["queued"]
+})
+metrics.callback("rejected_requests_total", "Analyses rejected because the server was overloaded", lambda: {
+    (("reason", reason),): count for reason, count in analysis_gate.stats()["rejected"].items()
+}, "counter")
+metrics.callback("inference_cache_lookups_total", "Inference cache lookups by outcome", lambda: {
+    (("result", result),): inference_cache.stats()[result] if inference_cache else 0
+    for result in ("memory_hits", "disk_hits", "misses")
+}, "counter")
+metrics.callback("result_cache_entries", "Entries in the result cache", lambda: result_cache.stats()["size"])
+
+def format_stream_event(stage, data, sse):
+    if sse:
+        return f"event: {stage}\ndata: {json.dumps(data)}\n\n"
+    return json.dumps({"stage": stage, "data": data}) + "\n"
+
+@app.route('/analyze/stream', methods=['POST'])
+def analyze_stream():
+    app_url = request.json.get('url', '')
+    period = request.json.get('period', '1y')
+
+    if not app_url:
+        return jsonify({"error": "No URL provided"}), 400
+
+    app_id = extract_app_id(app_url)
+    if not app_id:
+        return jsonify({"error": "Invalid URL"}), 400
+
+    sse = request.args.get('format') == 'sse' or 'text/event-stream' in request.headers.get('Accept', '')
+    # Streams share the result cache's single flight: a cached (or stale,
+    # refreshed in the background) result is replayed, a concurrent stream
+    # for the same app waits for the one already running, and only the
+    # owner runs the analysis
+    state, found = result_cache.claim(
+        app_id,
+        lambda: run_background_analysis(app_id, period),
+        cacheable=lambda result: result[1] == 200
+    )
+    # The slot is taken before streaming starts, so an overloaded server
+    # still answers with a plain 429/503, and is held until the stream closes
+    if state == "owner":
+        try:
+            analysis_gate.acquire()
+        except Overloaded as e:
+            result_cache.settle(app_id, found, error=e)
+            raise
+
+    def replay(result, cached):
+        # A shared result is replayed in the same stage order as a live run
+        payload, status = result
+        if status != 200:
+            yield format_stream_event("error", payload, sse)
+        else:
+            payload = select_period(payload, period)
+            for stage, keys in STREAM_STAGES:
+                yield format_stream_event(stage, {key: payload[key] for key in keys}, sse)
+        yield format_stream_event("done", {"status": status, "cached": cached}, sse)
+
+    def generate():
+        if state == "cached":
+            yield from replay(found, True)
+            return
+        if state == "wait":
+            try:
+                result = found.result()
+            except Exception as e:
+                yield format_stream_event("error", {"error": f"Internal server error: {str(e)}"}, sse)
+                yield format_stream_event("done", {"status": 500, "cached": False}, sse)
+                return
+            yield from replay(result, False)
+            return
+
+        payload = {}
+        outcome = None
+        try:
+            for stage, data in iter_analysis(app_id, period):
+                yield format_stream_event(stage, data, sse)
+                if stage == "error":
+                    outcome = (data, 404)
+                    yield format_stream_event("done", {"status": 404, "cached": False}, sse)
+                    return
+                payload.update(data)
+            outcome = (payload, 200)
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            outcome = e
+            yield format_stream_event("error", {"error": f"Internal server error: {str(e)}"}, sse)
+            yield format_stream_event("done", {"status": 500, "cached": False}, sse)
+            return
+        finally:
+            # Runs on client disconnect too, so waiting streams never hang
+            if isinstance(outcome, tuple):
+                result_cache.settle(app_id, found, outcome, cacheable=lambda result: result[1] == 200)
+            else:
+                result_cache.settle(
+                    app_id, found, error=outcome or RuntimeError("Stream closed before the analysis finished")
+                )
+        yield format_stream_event("done", {"status": 200, "cached": False}, sse)
+
+    mimetype = 'text/event-stream' if sse else 'application/x-ndjson'
+    response = Response(generate(), mimetype=mimetype)
+    if state == "owner":
+        def settle_unstarted():
+            # A client that disconnects before the body is first iterated
+            # closes generate() unstarted, and its finally never runs
+            if not found.done():
+                result_cache.settle(app_id, found, error=RuntimeError("Stream closed before the analysis started"))
+
+        response.call_on_close(settle_unstarted)
+        response.call_on_close(analysis_gate.release)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/analyze/jobs', methods=['POST'])
+def create_analysis_job():
+    app_url = request.json.get('url', '')
+    period = request.json.get('period', '1y')
+
+    if not app_url:
+        return jsonify({"error": "No URL provided"}), 400
+
+    app_id = extract_app_id(app_url)
+    if not app_id:
+        return jsonify({"error": "Invalid URL"}), 400
+
+    try:
+        job = job_manager.submit(app_id=app_id, period=period)
+    except JobQueueFull as e:
+        response = jsonify({"error": f"Too many analysis jobs: {str(e)}"})
+        response.headers["Retry-After"] = "30"
+        return response, 429
+
+    return jsonify({
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/analyze/jobs/{job.id}"
+    }), 202
+
+@app.route('/analyze/jobs/<job_id>', methods=['GET'])
+def get_analysis_job(job_id):
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({"error": "Job not found or expired"}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/health', methods=['GET'])
+def health():
+    # Liveness: the process is up; models may still be loading
+    return jsonify({"status": "ok", "models": models.status()})
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    # Readiness: every required model is loaded and warmed up
+    is_ready = models.ready()
+    return jsonify({"ready": is_ready, "models": models.status()}), 200 if is_ready else 503
+
+# Under gunicorn's preload_app the parent loads the models once and workers
+# share the weights copy-on-write after fork. Nothing runs on them in the
+# parent: torch's OpenMP thread pool doesn't survive fork, and a worker whose
+# parent ran multi-threaded torch work hangs on its first op. Each worker
+# warms up in post_fork (see gunicorn.conf.py).
+if os.getenv("PRELOAD_MODELS") == "1":
+    import torch
+
+    torch.set_num_threads(1)
+    models.load_all(warmup=False)
+    gc.freeze()
+
 if __name__ == '__main__':
-    app.run(debug=True, port=5001)
\ No newline at end of file
+    # Development server; production runs under gunicorn (see gunicorn.conf.py).
+    # Debug mode and the reloader are off unless FLASK_DEBUG=1.
+    # Warm the models in the background so the server starts right away;
+    # /ready reports when they are loaded. With the reloader, only the child
+    # process that serves requests loads them.
+    debug = os.getenv("FLASK_DEBUG") == "1"
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        threading.Thread(target=models.load_all, daemon=True).start()
+    app.run(debug=debug, host=os.getenv("HOST", "127.0.0.1"), port=int(os.getenv("PORT", "5001")), threaded=True)
\ No newline at end of file
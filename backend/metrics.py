@@ -0,0 +1,162 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = []
+    for name, value in labels:
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.type = "counter"
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.type = "histogram"
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, series in self._series.items():
+                for bound, count in zip(self.buckets, series):
+                    samples.append((f"{self.name}_bucket", key + (("le", _format_value(float(bound))),), count))
+                samples.append((f"{self.name}_bucket", key + (("le", "+Inf"),), series[-1]))
+                samples.append((f"{self.name}_sum", key, series[-2]))
+                samples.append((f"{self.name}_count", key, series[-1]))
+        return samples
+
+
+class Callback:
+    # Gauge or counter read from existing state at scrape time. fn returns a
+    # number, or a dict mapping label tuples to numbers.
+    def __init__(self, name, help_text, fn, metric_type="gauge"):
+        self.name = name
+        self.help = help_text
+        self.type = metric_type
+        self.fn = fn
+
+    def samples(self):
+        value = self.fn()
+        if isinstance(value, dict):
+            return [(self.name, tuple(sorted(key)), item) for key, item in value.items()]
+        return [(self.name, (), value)]
+
+
+class MetricsRegistry:
+    # Minimal Prometheus text exposition (version 0.0.4) for a single process
+    def __init__(self, prefix=""):
+        self.prefix = prefix
+        self._metrics = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text):
+        return self._add(Counter(self.prefix + name, help_text))
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(self.prefix + name, help_text, buckets))
+
+    def callback(self, name, help_text, fn, metric_type="gauge"):
+        return self._add(Callback(self.prefix + name, help_text, fn, metric_type))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            try:
+                samples = metric.samples()
+            except Exception as e:
+                print(f"Metrics error ({metric.name}): {str(e)}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class StageTimer:
+    # Times named pipeline stages into a histogram and, while a request is
+    # being served, into that request's list for the Server-Timing header.
+    # The list lives in a context variable, so work handed to a pool with
+    # contextvars.copy_context().run is attributed to the same request.
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self._stages = contextvars.ContextVar("stage_timings", default=None)
+
+    def start_request(self):
+        self._stages.set([])
+
+    def finish_request(self):
+        stages = self._stages.get() or []
+        self._stages.set(None)
+        return stages
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.histogram.observe(elapsed, stage=name)
+            stages = self._stages.get()
+            if stages is not None:
+                stages.append((name, elapsed))
+
+
+def server_timing(stages):
+    # Repeated stages are summed, in the order they first ran
+    totals = {}
+    for name, elapsed in stages:
+        totals[name] = totals.get(name, 0.0) + elapsed
+    return ", ".join(f"{name};dur={elapsed * 1000:.1f}" for name, elapsed in totals.items())
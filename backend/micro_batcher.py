@@ -0,0 +1,115 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class _Request:
+    # Collects the per-text results of one caller's submission
+    def __init__(self, size):
+        self.future = Future()
+        self.results = [None] * size
+        self.remaining = size
+        self.lock = threading.Lock()
+
+    def fill(self, position, result):
+        with self.lock:
+            self.results[position] = result
+            self.remaining -= 1
+            done = self.remaining == 0
+        if done and not self.future.done():
+            self.future.set_result(self.results)
+
+    def fail(self, error):
+        if not self.future.done():
+            self.future.set_exception(error)
+
+
+class MicroBatcher:
+    # Shared inference service for the zero-shot classifier. Texts submitted by
+    # all in-flight requests go into one queue; a dedicated worker thread forms
+    # batches of at most max_batch_size texts, waiting no longer than
+    # max_wait_ms for a batch to fill, and hands each result back to its
+    # caller's future. Callable with the same interface as the classifier.
+
+    def __init__(self, classify, max_batch_size=32, max_wait_ms=10, on_batch=None):
+        self.classify = classify
+        self.on_batch = on_batch  # called with the size of every batch run
+        self.backend = getattr(classify, "backend", None)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = None
+        self._worker_pid = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_worker(self):
+        # Threads don't survive fork, so each process starts its own worker
+        # the first time it submits work (see PRELOAD_MODELS in main.py)
+        if self._worker_pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._worker_pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            threading.Thread(target=self._run, args=(self._queue,), name="inference-batcher", daemon=True).start()
+            self._worker_pid = os.getpid()
+
+    def submit(self, texts, candidate_labels, multi_label=False):
+        request = _Request(len(texts))
+        if not texts:
+            request.future.set_result([])
+            return request.future
+        self._ensure_worker()
+        key = (tuple(candidate_labels), multi_label)
+        for position, text in enumerate(texts):
+            self._queue.put((key, text, request, position))
+        return request.future
+
+    def __call__(self, sequences, candidate_labels, multi_label=False, batch_size=None, **kwargs):
+        if isinstance(sequences, str):
+            return self.submit([sequences], candidate_labels, multi_label).result()[0]
+        return self.submit(list(sequences), candidate_labels, multi_label).result()
+
+    def queue_depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _collect(self, work_queue):
+        items = [work_queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(items) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                items.append(work_queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self, work_queue):
+        while True:
+            items = self._collect(work_queue)
+            # Texts can only share a forward pass when they use the same labels
+            groups = {}
+            for item in items:
+                groups.setdefault(item[0], []).append(item)
+            for (candidate_labels, multi_label), group in groups.items():
+                self._classify_group(list(candidate_labels), multi_label, group)
+
+    def _classify_group(self, candidate_labels, multi_label, group):
+        try:
+            results = self.classify(
+                [text for _, text, _, _ in group],
+                candidate_labels,
+                multi_label=multi_label,
+                batch_size=len(group)
+            )
+        except Exception as e:
+            for _, _, request, _ in group:
+                request.fail(e)
+            return
+        if self.on_batch:
+            self.on_batch(len(group))
+        for (_, _, request, position), result in zip(group, results):
+            request.fill(position, result)
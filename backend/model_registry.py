@@ -0,0 +1,107 @@
+import threading
+import time
+import traceback
+
+
+class ModelRegistry:
+    # Loads models on first use (or all at once with load_all) and runs an
+    # optional warmup so the first real request doesn't pay one-time setup
+    # costs. A model that fails to load is reported and served as None.
+    # load_all(warmup=False) leaves the models "cold": loaded, but warmed up
+    # only on first use or on the next load_all().
+
+    def __init__(self):
+        self._entries = {}
+
+    def register(self, name, loader, warmup=None, required=True):
+        self._entries[name] = {
+            "loader": loader,
+            "warmup": warmup,
+            "required": required,
+            "model": None,
+            "state": "unloaded",
+            "error": None,
+            "load_seconds": None,
+            "warmup_seconds": None,
+            "lock": threading.Lock()
+        }
+
+    def get(self, name):
+        entry = self._entries[name]
+        if entry["state"] in ("ready", "failed"):
+            return entry["model"]
+        with entry["lock"]:
+            if entry["state"] == "cold":
+                self._warm(name, entry)
+            elif entry["state"] not in ("ready", "failed"):
+                self._load(name, entry)
+        return entry["model"]
+
+    def loaded(self, name):
+        # The model if it is loaded, without triggering a load or warmup
+        entry = self._entries[name]
+        return entry["model"] if entry["state"] in ("ready", "cold") else None
+
+    def load_all(self, warmup=True):
+        for name, entry in self._entries.items():
+            if warmup:
+                self.get(name)
+                continue
+            with entry["lock"]:
+                if entry["state"] == "unloaded":
+                    self._load(name, entry, warmup=False)
+
+    def set(self, name, model):
+        # Replace a model in place, e.g. with a stand-in for benchmarks
+        entry = self._entries[name]
+        with entry["lock"]:
+            entry.update(model=model, state="ready", error=None)
+
+    def _load(self, name, entry, warmup=True):
+        entry["state"] = "loading"
+        start = time.perf_counter()
+        try:
+            entry["model"] = entry["loader"]()
+            entry["load_seconds"] = round(time.perf_counter() - start, 3)
+        except Exception as e:
+            self._fail(name, entry, e)
+            return
+        entry["state"] = "cold"
+        if warmup:
+            self._warm(name, entry)
+
+    def _warm(self, name, entry):
+        try:
+            if entry["warmup"] and entry["model"] is not None:
+                start = time.perf_counter()
+                entry["warmup"](entry["model"])
+                entry["warmup_seconds"] = round(time.perf_counter() - start, 3)
+            entry["state"] = "ready"
+        except Exception as e:
+            self._fail(name, entry, e)
+
+    def _fail(self, name, entry, e):
+        traceback.print_exc()
+        print(f"Model loading error ({name}): {str(e)}")
+        entry["model"] = None
+        entry["error"] = str(e)
+        entry["state"] = "failed"
+
+    def status(self):
+        return {
+            name: {
+                "state": entry["state"],
+                "required": entry["required"],
+                "error": entry["error"],
+                "load_seconds": entry["load_seconds"],
+                "warmup_seconds": entry["warmup_seconds"]
+            }
+            for name, entry in self._entries.items()
+        }
+
+    def ready(self):
+        return all(
+            entry["state"] == "ready"
+            for entry in self._entries.values()
+            if entry["required"]
+        )
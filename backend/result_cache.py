@@ -0,0 +1,117 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class ResultCache:
+    # Bounded LRU cache with a TTL. Stale entries are served while a single
+    # background refresh runs, and concurrent misses for the same key wait on
+    # the computation already in flight instead of starting their own.
+
+    def __init__(self, max_entries=128, ttl_seconds=600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (value, stored_at)
+        self._inflight = {}  # key -> Future
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "waits": 0,
+            "evictions": 0,
+            "refreshes": 0,
+            "errors": 0
+        }
+
+    def get_or_compute(self, key, compute, cacheable=None, refresh=None):
+        # refresh, if given, recomputes stale entries in the background
+        # instead of compute
+        state, found = self.claim(key, refresh or compute, cacheable)
+        if state == "cached":
+            return found
+        if state == "owner":
+            self._run(key, compute, found, cacheable)
+        return found.result()
+
+    def claim(self, key, compute, cacheable=None):
+        # Lookup for callers that may compute the value themselves (e.g. while
+        # streaming it). Returns ("cached", value) for a fresh or stale entry,
+        # refreshing a stale one in the background with compute;
+        # ("wait", future) when another caller is computing the key; or
+        # ("owner", future) after registering this caller as the one computing
+        # it, in which case it must call settle() with the future.
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                self._entries.move_to_end(key)
+                if time.monotonic() - stored_at < self.ttl_seconds:
+                    self._stats["hits"] += 1
+                    return "cached", value
+                self._stats["stale_hits"] += 1
+                if key not in self._inflight:
+                    self._stats["refreshes"] += 1
+                    future = self._inflight[key] = Future()
+                    threading.Thread(
+                        target=self._run,
+                        args=(key, compute, future, cacheable),
+                        daemon=True
+                    ).start()
+                return "cached", value
+
+            future = self._inflight.get(key)
+            if future is not None:
+                self._stats["waits"] += 1
+                return "wait", future
+            self._stats["misses"] += 1
+            future = self._inflight[key] = Future()
+            return "owner", future
+
+    def _run(self, key, compute, future, cacheable):
+        try:
+            value = compute()
+        except BaseException as e:
+            self.settle(key, future, error=e)
+            return
+        self.settle(key, future, value, cacheable=cacheable)
+
+    def settle(self, key, future, value=None, error=None, cacheable=None):
+        # Completes a computation claimed with claim(); waiters get the value
+        # or the error
+        with self._lock:
+            if error is not None:
+                self._stats["errors"] += 1
+            elif cacheable is None or cacheable(value):
+                self._store(key, value)
+            if self._inflight.get(key) is future:
+                self._inflight.pop(key)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(value)
+
+    def _store(self, key, value):
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._stats,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "inflight": len(self._inflight)
+            }
@@ -0,0 +1,161 @@
+import json
+
+import numpy as np
+
+from trends import SENTIMENT_CODES, SENTIMENT_LABELS
+
+NO_CODE = -1  # sentiment/category not known yet
+_SENTIMENT_NAMES = np.array(SENTIMENT_LABELS + [None], dtype=object)  # code -1 -> None
+
+
+def _parse_times(values):
+    # "YYYY-MM-DD[ HH:MM:SS]" strings, datetimes or None -> datetime64[s], NaT when missing
+    return np.array(
+        [value if value not in (None, "", "N/A") else "NaT" for value in values],
+        dtype="datetime64[s]"
+    )
+
+
+class ReviewBatch:
+    # Reviews as parallel columns instead of one dict per review:
+    #
+    #   text        object array of str, in review order (newest first)
+    #   review_id   object array of str, or None for reviews that were not stored
+    #   at          datetime64[s], NaT when the Play Store gave no date
+    #   compound    float64 VADER score, NaN until scored
+    #   sentiment   int8 index into SENTIMENT_LABELS, NO_CODE until scored
+    #   category    int8 index into category_labels, NO_CODE until categorized
+    #   cluster     int64 cluster key shared by near-duplicates (see enrich_reviews)
+    #   text_lower  lowercased text, filled in by enrich_reviews
+    #
+    # Slicing returns views of the same columns; masks and index arrays copy
+    # the columns' pointers and numbers but never the strings themselves.
+    # Writes through a slice view reach the parent batch.
+
+    COLUMNS = ("text", "review_id", "at", "compound", "sentiment", "category", "cluster", "text_lower")
+
+    def __init__(self, text, at, category_labels, review_id=None, compound=None,
+                 sentiment=None, category=None, cluster=None, text_lower=None):
+        size = len(text)
+        self.category_labels = list(category_labels)
+        self.text = text if isinstance(text, np.ndarray) else np.array(list(text), dtype=object)
+        self.at = at if isinstance(at, np.ndarray) else _parse_times(at)
+        self.review_id = review_id if review_id is not None else np.full(size, None, dtype=object)
+        self.compound = compound if compound is not None else np.full(size, np.nan)
+        self.sentiment = sentiment if sentiment is not None else np.full(size, NO_CODE, dtype=np.int8)
+        self.category = category if category is not None else np.full(size, NO_CODE, dtype=np.int8)
+        self.cluster = cluster if cluster is not None else np.arange(size, dtype=np.int64)
+        self.text_lower = text_lower
+
+    @classmethod
+    def from_records(cls, records, category_labels):
+        # records are dicts with "content" and optionally "review_id", "at",
+        # "compound", "sentiment" and "category" (labels, not codes)
+        category_codes = {label: code for code, label in enumerate(category_labels)}
+        return cls(
+            np.array([record["content"] or "" for record in records], dtype=object),
+            _parse_times([record.get("at") for record in records]),
+            category_labels,
+            review_id=np.array([record.get("review_id") for record in records], dtype=object),
+            compound=np.array(
+                [np.nan if record.get("compound") is None else record["compound"] for record in records],
+                dtype=np.float64
+            ),
+            sentiment=np.array(
+                [SENTIMENT_CODES.get(record.get("sentiment"), NO_CODE) for record in records],
+                dtype=np.int8
+            ),
+            category=np.array(
+                [category_codes.get(record.get("category"), NO_CODE) for record in records],
+                dtype=np.int8
+            )
+        )
+
+    def __len__(self):
+        return len(self.text)
+
+    def __getitem__(self, key):
+        # A slice, boolean mask or index array gives a batch; an int gives one record
+        if isinstance(key, (int, np.integer)):
+            return self.record(key)
+        columns = {
+            name: getattr(self, name)[key] if getattr(self, name) is not None else None
+            for name in self.COLUMNS
+        }
+        return ReviewBatch(at=columns.pop("at"), category_labels=self.category_labels, **columns)
+
+    @property
+    def date(self):
+        return self.at.astype("datetime64[D]")
+
+    def month_strings(self):
+        # "YYYY-MM" per review, "N/A" without a date
+        months = np.datetime_as_string(self.at.astype("datetime64[M]"), unit="M")
+        months[np.isnat(self.at)] = "N/A"
+        return months
+
+    def sentiment_labels(self):
+        return _SENTIMENT_NAMES[self.sentiment].tolist()
+
+    def category_names(self):
+        names = np.array(self.category_labels + [None], dtype=object)
+        return names[self.category].tolist()
+
+    def relabel(self, category_labels):
+        # Re-codes the category column for another label set; categories
+        # missing from it become unknown
+        category_labels = list(category_labels)
+        if category_labels == self.category_labels:
+            return
+        codes = np.array(
+            [category_labels.index(label) if label in category_labels else NO_CODE for label in self.category_labels]
+            + [NO_CODE],
+            dtype=np.int8
+        )
+        self.category = codes[self.category]
+        self.category_labels = category_labels
+
+    def set_categories(self, positions, labels):
+        # One label per position
+        self.category[positions] = [self.category_labels.index(label) for label in labels]
+
+    def record(self, position):
+        at = self.at[position]
+        category = int(self.category[position])
+        return {
+            "review_id": self.review_id[position],
+            "content": self.text[position],
+            "at": None if np.isnat(at) else str(at).replace("T", " "),
+            "date": "N/A" if np.isnat(at) else str(at)[:10],
+            "compound": None if np.isnan(self.compound[position]) else float(self.compound[position]),
+            "sentiment": _SENTIMENT_NAMES[self.sentiment[position]],
+            "category": self.category_labels[category] if category != NO_CODE else None
+        }
+
+    def at_strings(self):
+        # "YYYY-MM-DD HH:MM:SS" per review (None without a date), as the review store keeps them
+        strings = np.array(
+            [value.replace("T", " ") for value in np.datetime_as_string(self.at, unit="s").tolist()],
+            dtype=object
+        )
+        strings[np.isnat(self.at)] = None
+        return strings
+
+    def to_json(self):
+        # Column-oriented JSON: one array per column, each encoded with a
+        # single json.dumps call, so the cost stays flat per review
+        dates = np.datetime_as_string(self.date, unit="D").astype(object)
+        dates[np.isnat(self.at)] = None
+        compound = self.compound.astype(object)
+        compound[np.isnan(self.compound)] = None
+        columns = {
+            "review_id": self.review_id.tolist(),
+            "content": self.text.tolist(),
+            "date": dates.tolist(),
+            "compound": compound.tolist(),
+            "sentiment": self.sentiment_labels(),
+            "category": self.category_names()
+        }
+        return "{" + ",".join(
+            f"{json.dumps(name)}:{json.dumps(values, ensure_ascii=False)}" for name, values in columns.items()
+        ) + f',"count":{len(self)}}}'
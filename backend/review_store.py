@@ -0,0 +1,132 @@
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+from review_batch import NO_CODE, ReviewBatch
+from trends import SENTIMENT_CODES
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reviews (
+    app_id TEXT NOT NULL,
+    review_id TEXT NOT NULL,
+    content TEXT NOT NULL,
+    at TEXT,
+    compound REAL,
+    sentiment TEXT,
+    category TEXT,
+    category_model TEXT,
+    PRIMARY KEY (app_id, review_id)
+);
+CREATE INDEX IF NOT EXISTS idx_reviews_app_at ON reviews (app_id, at DESC);
+"""
+
+
+class ReviewStore:
+    # SQLite-backed store of scraped reviews keyed by (app_id, review_id)
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn_pid = None
+        self._connect()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        self._conn_pid = os.getpid()
+        self._connection = conn
+
+    @property
+    def _conn(self):
+        # A connection opened before fork must not be used by the workers
+        if self._conn_pid != os.getpid():
+            self._connect()
+        return self._connection
+
+    def latest_at(self, app_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(at) FROM reviews WHERE app_id = ?", (app_id,)
+            ).fetchone()
+        return row[0]
+
+    def known_ids(self, app_id, review_ids):
+        review_ids = list(review_ids)
+        if not review_ids:
+            return set()
+        placeholders = ",".join("?" * len(review_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT review_id FROM reviews WHERE app_id = ? AND review_id IN ({placeholders})",
+                [app_id, *review_ids]
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def add_reviews(self, app_id, batch):
+        # batch is a ReviewBatch; reviews without an id are not stored
+        stored = batch[np.not_equal(batch.review_id, None)]
+        compound = stored.compound.astype(object)
+        compound[np.isnan(stored.compound)] = None
+        rows = zip(
+            [app_id] * len(stored),
+            stored.review_id.tolist(),
+            stored.text.tolist(),
+            stored.at_strings().tolist(),
+            compound.tolist(),
+            stored.sentiment_labels()
+        )
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO reviews (app_id, review_id, content, at, compound, sentiment) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def save_categories(self, app_id, categories, category_model):
+        # categories maps review_id -> category label
+        rows = [
+            (category, category_model, app_id, review_id)
+            for review_id, category in categories.items()
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE reviews SET category = ?, category_model = ? WHERE app_id = ? AND review_id = ?",
+                rows
+            )
+
+    def load_reviews(self, app_id, category_model, category_labels, limit=None):
+        # Newest first, matching the order the Play Store scraper returns, as
+        # a ReviewBatch. Categories computed by a different model are not returned.
+        query = (
+            "SELECT review_id, content, at, compound, sentiment, category, category_model "
+            "FROM reviews WHERE app_id = ? ORDER BY at DESC"
+        )
+        params = [app_id]
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        category_codes = {label: code for code, label in enumerate(category_labels)}
+        review_ids, contents, at, compound, sentiments, categories, category_models = (
+            zip(*rows) if rows else ([],) * 7
+        )
+        return ReviewBatch(
+            np.array(contents, dtype=object),
+            np.array([value or "NaT" for value in at], dtype="datetime64[s]"),
+            category_labels,
+            review_id=np.array(review_ids, dtype=object),
+            compound=np.array([np.nan if value is None else value for value in compound], dtype=np.float64),
+            sentiment=np.array([SENTIMENT_CODES.get(label, NO_CODE) for label in sentiments], dtype=np.int8),
+            category=np.array(
+                [
+                    category_codes.get(category, NO_CODE) if model == category_model else NO_CODE
+                    for category, model in zip(categories, category_models)
+                ],
+                dtype=np.int8
+            )
+        )
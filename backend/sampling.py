@@ -0,0 +1,170 @@
+import math
+import random
+from collections import defaultdict
+
+Z_95 = 1.96
+
+
+class AdaptiveEstimator:
+    # Estimates the category shares of a set of reviews when only some of them
+    # can be sent through the model. Reviews whose category is already known
+    # (stored, keyword rules, fast tier) are counted exactly; the uncertain
+    # ones are classified in seeded rounds, allocated across strata in
+    # proportion to their size, and their shares are estimated with a
+    # stratified estimator and a 95% normal-approximation interval.
+    # A unit can stand for several reviews (a cluster of near-duplicates), in
+    # which case its weight is the number of reviews it covers.
+
+    def __init__(self, labels, known_counts, strata, seed=0, round_size=32,
+                 ci_target=5.0, max_samples=None, z=Z_95, weights=None):
+        # strata holds one hashable stratum key per uncertain unit; positions
+        # returned by next_round index into that list
+        self.labels = list(labels)
+        self.known_counts = {label: known_counts.get(label, 0) for label in self.labels}
+        self.known_total = sum(known_counts.values())
+        self.weights = list(weights) if weights is not None else [1] * len(strata)
+        self.units = len(strata)
+        self.population = sum(self.weights)
+        self.round_size = round_size
+        self.ci_target = ci_target
+        self.max_samples = self.units if max_samples is None else min(max_samples, self.units)
+        self.z = z
+        self.rounds = 0
+
+        rng = random.Random(seed)
+        members = defaultdict(list)
+        for position, stratum in enumerate(strata):
+            members[stratum].append(position)
+        # Sorted so the draw order only depends on the data and the seed
+        self._strata = sorted(members, key=repr)
+        self._members = {}
+        for stratum in self._strata:
+            positions = members[stratum]
+            rng.shuffle(positions)
+            self._members[stratum] = positions
+        self._taken = {stratum: 0 for stratum in self._strata}
+        self._counts = {stratum: defaultdict(int) for stratum in self._strata}
+        self._drawn_weights = {stratum: [] for stratum in self._strata}
+        self._drawn_labels = {stratum: [] for stratum in self._strata}
+        self._stratum_weight = defaultdict(int)
+        for stratum, weight in zip(strata, self.weights):
+            self._stratum_weight[stratum] += weight
+        self._stratum_of = strata
+        self.sampled = 0  # units drawn
+        self.covered = 0  # reviews those units stand for
+
+    def next_round(self):
+        # Positions to classify next; greedy allocation keeps every stratum's
+        # sample as close as possible to its proportional share
+        size = min(self.round_size, self.max_samples - self.sampled)
+        if size <= 0 or self.converged():
+            return []
+        target = self.sampled + size
+        positions = []
+        for _ in range(size):
+            stratum = max(
+                (s for s in self._strata if self._taken[s] < len(self._members[s])),
+                key=lambda s: len(self._members[s]) * target / self.units - self._taken[s]
+            )
+            positions.append(self._members[stratum][self._taken[stratum]])
+            self._taken[stratum] += 1
+        self.sampled += len(positions)
+        self.covered += sum(self.weights[position] for position in positions)
+        self.rounds += 1
+        return positions
+
+    def add(self, positions, labels):
+        for position, label in zip(positions, labels):
+            self._counts[self._stratum_of[position]][label] += self.weights[position]
+            self._drawn_weights[self._stratum_of[position]].append(self.weights[position])
+            self._drawn_labels[self._stratum_of[position]].append(label)
+
+    def _uncertain_shares(self):
+        # Stratified share and variance of each label among the uncertain
+        # reviews, weighting only the strata that have been sampled. Within a
+        # stratum the share is a ratio estimate over the drawn units' weights.
+        sampled = [s for s in self._strata if self._taken[s]]
+        weight_total = sum(self._stratum_weight[s] for s in sampled)
+        shares = {}
+        for label in self.labels:
+            share = 0.0
+            variance = 0.0
+            for stratum in sampled:
+                size = len(self._members[stratum])
+                taken = self._taken[stratum]
+                weight = self._stratum_weight[stratum] / weight_total
+                drawn_weights = self._drawn_weights[stratum]
+                drawn_total = sum(drawn_weights)
+                p = self._counts[stratum][label] / drawn_total
+                share += weight * p
+                mean_weight = drawn_total / taken
+                spread = sum(
+                    (w * ((drawn == label) - p)) ** 2
+                    for w, drawn in zip(drawn_weights, self._drawn_labels[stratum])
+                ) / (taken * mean_weight ** 2)
+                # Smoothed so a stratum whose draws all agree doesn't claim zero
+                # variance; finite population correction for small strata
+                smoothed = (sum(1 for drawn in self._drawn_labels[stratum] if drawn == label) + 1) / (taken + 2)
+                stratum_variance = max(spread, smoothed * (1 - smoothed)) / max(taken - 1, 1)
+                variance += weight ** 2 * (1 - taken / size) * stratum_variance
+            shares[label] = (share, variance)
+        return shares
+
+    def estimate(self):
+        # Returns ({label: percent}, {label: [low, high]}) over every review
+        total = self.known_total + self.population
+        if not total:
+            return {}, {}
+        if not self.sampled:
+            # Nothing classified: report the known reviews' shares and bound
+            # each label by the uncertain reviews all being (or not being) it
+            percentages = {
+                label: round(count / self.known_total * 100, 2) if self.known_total else 0
+                for label, count in self.known_counts.items()
+            }
+            intervals = {
+                label: [
+                    round(count / total * 100, 2),
+                    round((count + self.population) / total * 100, 2)
+                ]
+                for label, count in self.known_counts.items()
+            }
+            return percentages, intervals
+
+        percentages = {}
+        intervals = {}
+        for label, (share, variance) in self._uncertain_shares().items():
+            point = (self.known_counts[label] + self.population * share) / total
+            half_width = self.z * math.sqrt(variance) * self.population / total
+            percentages[label] = round(point * 100, 2)
+            intervals[label] = [
+                round(max(0.0, point - half_width) * 100, 2),
+                round(min(1.0, point + half_width) * 100, 2)
+            ]
+        return percentages, intervals
+
+    def half_width(self):
+        # Widest interval half-width, in percentage points
+        if not self.population:
+            return 0.0
+        if not self.sampled:
+            return 100.0
+        total = self.known_total + self.population
+        return max(
+            self.z * math.sqrt(variance) * self.population / total * 100
+            for _, variance in self._uncertain_shares().values()
+        )
+
+    def converged(self):
+        return self.sampled > 0 and self.half_width() <= self.ci_target
+
+    def stop_reason(self):
+        if not self.population:
+            return "exact"
+        if self.sampled == self.units:
+            return "exhausted"
+        if self.converged():
+            return "converged"
+        if self.sampled >= self.max_samples:
+            return "max_samples"
+        return "latency"
@@ -1,6 +1,33 @@
-from google_play_scraper import reviews_all
+import argparse
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from google_play_scraper import Sort, reviews_all
+from google_play_scraper.features.reviews import _ContinuationToken
 import pandas as pd
 
+from scraper import ReviewScraper, parse_locales
+
+# Bulk corpus builder. Each (app, lang, country) stream is paged through and
+# written in chunks of reviews as shards:
+#
+#   <output>/
+#       checkpoint.json                     continuation token and progress per stream
+#       <app_id>/<lang>-<country>/part-00000.parquet (or .jsonl)
+#
+# A shard is renamed into place before the checkpoint moves past it, so a
+# crashed run resumes from the last written shard; pages fetched again after
+# a restart are dropped by review id.
+
+REVIEW_FIELDS = (
+    "reviewId", "userName", "content", "score", "thumbsUpCount",
+    "reviewCreatedVersion", "at", "replyContent", "repliedAt", "appVersion"
+)
+CHECKPOINT_FILE = "checkpoint.json"
+
+
 def scrape_reviews(app_id):
     try:
         reviews = reviews_all(
@@ -22,7 +49,194 @@ def scrape_reviews(app_id):
         print(f"Scraper error: {str(e)}")
         return []
 
-# Example usage:
-# reviews = scrape_reviews("com.spotify.music")
-# df = pd.DataFrame(reviews)
-# df.to_csv("spotify_reviews.csv", index=False)
\ No newline at end of file
+
+def restore_token(value, lang, country, sort, count):
+    # Only the token string is checkpointed; the rest is rebuilt from the
+    # stream. reviews() takes the sort from a token as the raw request value.
+    if value is None:
+        return None
+    return _ContinuationToken(value, lang, country, getattr(sort, "value", sort), count, None, None)
+
+
+class CorpusBuilder:
+    def __init__(self, output_dir, scraper=None, file_format="parquet", chunk_size=5000,
+                 concurrency=4, max_reviews=None, sort=Sort.NEWEST):
+        if file_format not in ("parquet", "jsonl"):
+            raise ValueError(f"Unknown shard format '{file_format}', expected parquet or jsonl")
+        if file_format == "parquet":
+            # Fail before scraping anything if no Parquet engine is installed
+            pd.io.parquet.get_engine("auto")
+        self.output_dir = output_dir
+        self.scraper = scraper or ReviewScraper()
+        self.file_format = file_format
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
+        self.max_reviews = max_reviews
+        self.sort = sort
+        self._lock = threading.Lock()
+        self._seen = {}  # app_id -> review ids already written, shared by its locales
+        os.makedirs(output_dir, exist_ok=True)
+        self.checkpoint = self._load_checkpoint()
+
+    def _checkpoint_path(self):
+        return os.path.join(self.output_dir, CHECKPOINT_FILE)
+
+    def _load_checkpoint(self):
+        try:
+            with open(self._checkpoint_path(), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _save_checkpoint(self, stream, state):
+        with self._lock:
+            self.checkpoint[stream] = state
+            tmp_path = f"{self._checkpoint_path()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.checkpoint, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self._checkpoint_path())
+
+    def _stream_dir(self, app_id, lang, country):
+        return os.path.join(self.output_dir, app_id, f"{lang}-{country}")
+
+    def _shards(self, app_id, lang, country):
+        directory = self._stream_dir(app_id, lang, country)
+        if not os.path.isdir(directory):
+            return []
+        suffix = f".{self.file_format}"
+        return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                      if name.startswith("part-") and name.endswith(suffix))
+
+    def _read_ids(self, path):
+        if self.file_format == "parquet":
+            return pd.read_parquet(path, columns=["reviewId"])["reviewId"].tolist()
+        with open(path, encoding="utf-8") as f:
+            return [json.loads(line)["reviewId"] for line in f if line.strip()]
+
+    def _seen_ids(self, app_id, locales):
+        # Rebuilt from the shards on disk the first time an app is touched
+        with self._lock:
+            seen = self._seen.get(app_id)
+            if seen is None:
+                seen = self._seen[app_id] = set()
+                for lang, country in locales:
+                    for path in self._shards(app_id, lang, country):
+                        seen.update(self._read_ids(path))
+            return seen
+
+    def _write_shard(self, app_id, lang, country, index, rows):
+        directory = self._stream_dir(app_id, lang, country)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"part-{index:05d}.{self.file_format}")
+        tmp_path = f"{path}.tmp"
+        if self.file_format == "parquet":
+            pd.DataFrame(rows).to_parquet(tmp_path, index=False)
+        else:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(row, default=str) + "\n")
+        os.replace(tmp_path, path)
+
+    def _record(self, review, app_id, lang, country):
+        record = {"app_id": app_id, "lang": lang, "country": country}
+        record.update({field: review.get(field) for field in REVIEW_FIELDS})
+        return record
+
+    def scrape_stream(self, app_id, lang, country, locales):
+        stream = f"{app_id}/{lang}-{country}"
+        state = dict(self.checkpoint.get(stream) or {"token": None, "reviews": 0, "done": False})
+        if state["done"]:
+            return state
+        seen = self._seen_ids(app_id, locales)
+        shard = len(self._shards(app_id, lang, country))
+        token = restore_token(state["token"], lang, country, self.sort, self.scraper.page_size)
+        buffered = []
+
+        try:
+            while True:
+                # An empty page after a continuation token raises
+                # EmptyReviewPage (once retries run out) instead of ending
+                # the stream, so the checkpoint stays where it was
+                page, next_token = self.scraper.review_page(app_id, lang, country, self.sort, token)
+                with self._lock:
+                    fresh = [review for review in page if review["reviewId"] not in seen]
+                    seen.update(review["reviewId"] for review in fresh)
+                buffered.extend(self._record(review, app_id, lang, country) for review in fresh)
+                token = next_token
+                done = (
+                    not page
+                    or getattr(token, "token", None) is None
+                    or (self.max_reviews is not None and state["reviews"] + len(buffered) >= self.max_reviews)
+                )
+                if self.max_reviews is not None:
+                    buffered = buffered[:self.max_reviews - state["reviews"]]
+                if len(buffered) >= self.chunk_size or done:
+                    if buffered:
+                        self._write_shard(app_id, lang, country, shard, buffered)
+                        shard += 1
+                    state = {
+                        "token": None if done else token.token,
+                        "reviews": state["reviews"] + len(buffered),
+                        "done": done
+                    }
+                    self._save_checkpoint(stream, state)
+                    buffered = []
+                if done:
+                    return state
+        except Exception:
+            # Reviews that never reached a shard may be fetched again by
+            # another locale of the same app, or by the next run
+            with self._lock:
+                seen.difference_update(record["reviewId"] for record in buffered)
+            raise
+
+    def run(self, app_ids, locales=(("en", "us"),)):
+        # One task per stream; each stream pages sequentially, and the
+        # scraper's rate limiter bounds requests across all of them
+        summary = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="corpus") as pool:
+            futures = {
+                (app_id, lang, country): pool.submit(self.scrape_stream, app_id, lang, country, locales)
+                for app_id in app_ids
+                for lang, country in locales
+            }
+            for (app_id, lang, country), future in futures.items():
+                stream = f"{app_id}/{lang}-{country}"
+                try:
+                    state = future.result()
+                    summary[stream] = state["reviews"]
+                    print(f"{stream}: {state['reviews']} reviews")
+                except Exception as e:
+                    summary[stream] = None
+                    print(f"Scraper error ({stream}): {str(e)}")
+        return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a review corpus from many apps, resumable after a crash")
+    parser.add_argument("app_ids", nargs="*", help="Play Store app ids")
+    parser.add_argument("--apps-file", help="File with one app id per line")
+    parser.add_argument("--output-dir", default="corpus")
+    parser.add_argument("--format", choices=("parquet", "jsonl"), default="parquet")
+    parser.add_argument("--locales", default="en:us", help="Comma-separated lang:country pairs")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Reviews per shard")
+    parser.add_argument("--max-reviews", type=int, help="Stop each app/locale after this many reviews")
+    parser.add_argument("--concurrency", type=int, default=4, help="Streams scraped at once")
+    parser.add_argument("--rate", type=float, default=5.0, help="Requests per second across all streams")
+    parser.add_argument("--retries", type=int, default=3)
+    args = parser.parse_args()
+
+    app_ids = list(args.app_ids)
+    if args.apps_file:
+        with open(args.apps_file, encoding="utf-8") as f:
+            app_ids.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+
+    builder = CorpusBuilder(
+        args.output_dir,
+        scraper=ReviewScraper(rate_per_second=args.rate, retries=args.retries),
+        file_format=args.format,
+        chunk_size=args.chunk_size,
+        concurrency=args.concurrency,
+        max_reviews=args.max_reviews
+    )
+    builder.run(dict.fromkeys(app_ids), parse_locales(args.locales))
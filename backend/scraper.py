@@ -0,0 +1,149 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from google_play_scraper import Sort, reviews, app as play_store_app
+
+MAX_PAGE_SIZE = 200  # google_play_scraper fetches at most 200 reviews per request
+
+
+class EmptyReviewPage(Exception):
+    # google_play_scraper's reviews() swallows fetch errors and returns an
+    # empty page without a next token, which reads like the last page. An
+    # empty page after a continuation token is raised as this instead, so it
+    # is retried like any other fetch error.
+    pass
+
+
+class RateLimiter:
+    # Token bucket shared by every scraper thread
+    def __init__(self, rate_per_second, burst=None):
+        self.rate = rate_per_second
+        self.capacity = burst or max(1, int(rate_per_second))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class ReviewScraper:
+    # Fetches app metadata and review pages concurrently on a shared pool.
+    # fetch_reviews waits on that pool, so callers that want it in the
+    # background run it on coordinator instead of executor. fetch_page and
+    # fetch_details default to google_play_scraper's reviews() and app(), and
+    # can be replaced with canned pages or a local fixture server in tests.
+
+    def __init__(self, fetch_page=reviews, fetch_details=play_store_app, max_workers=4,
+                 rate_per_second=5.0, retries=3, backoff_seconds=0.5, page_size=MAX_PAGE_SIZE):
+        self.fetch_page = fetch_page
+        self.fetch_details = fetch_details
+        self.rate_limiter = RateLimiter(rate_per_second)
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.page_size = min(page_size, MAX_PAGE_SIZE)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scraper")
+        self.coordinator = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scraper-coordinator")
+
+    def _call(self, fn, *args, **kwargs):
+        # Rate-limited call with exponential backoff and jitter between retries
+        for attempt in range(self.retries + 1):
+            self.rate_limiter.acquire()
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff_seconds * (2 ** attempt)
+                print(f"Scraper retry {attempt + 1}/{self.retries} after error: {str(e)}")
+                time.sleep(delay + random.uniform(0, delay))
+
+    def app_details(self, app_id, lang="en", country="us"):
+        return self._call(self.fetch_details, app_id, lang=lang, country=country)
+
+    def submit_app_details(self, app_id, lang="en", country="us"):
+        return self.executor.submit(self.app_details, app_id, lang, country)
+
+    def review_page(self, app_id, lang="en", country="us", sort=Sort.NEWEST, continuation_token=None):
+        # One page of reviews and the token for the next one. Raises
+        # EmptyReviewPage if a page after the first stays empty after retries.
+        return self._call(self._fetch_review_page, app_id, lang, country, sort, continuation_token)
+
+    def _fetch_review_page(self, app_id, lang, country, sort, continuation_token):
+        page, token = self.fetch_page(
+            app_id,
+            lang=lang,
+            country=country,
+            sort=sort,
+            count=self.page_size,
+            continuation_token=continuation_token
+        )
+        if not page and getattr(continuation_token, "token", None) is not None:
+            raise EmptyReviewPage(f"Empty review page for {app_id} ({lang}-{country}) where more were expected")
+        return page, token
+
+    def _locale_reviews(self, app_id, lang, country, budget, known_ids, sort):
+        fetched = []
+        token = None
+        while len(fetched) < budget:
+            try:
+                page, token = self.review_page(app_id, lang, country, sort, token)
+            except EmptyReviewPage as e:
+                # Incremental fetches stop at the first stored review, so
+                # storing a cut-short run would leave a gap that is never filled
+                if known_ids:
+                    raise
+                print(f"Scraper error: {str(e)}; keeping the {len(fetched)} reviews fetched so far")
+                break
+            if not page:
+                break
+            fresh = page
+            if known_ids:
+                # Stop once we reach reviews we already have
+                known = known_ids([review["reviewId"] for review in page])
+                fresh = [review for review in page if review["reviewId"] not in known]
+            fetched.extend(fresh)
+            if len(fresh) < len(page) or token is None or getattr(token, "token", None) is None:
+                break
+        return fetched[:budget]
+
+    def fetch_reviews(self, app_id, locales=(("en", "us"),), budget=1000, known_ids=None, sort=Sort.NEWEST):
+        # Pages through each (lang, country) pair concurrently, up to budget
+        # reviews per pair, and merges them newest first without duplicates
+        futures = [
+            self.executor.submit(self._locale_reviews, app_id, lang, country, budget, known_ids, sort)
+            for lang, country in locales
+        ]
+        merged = {}
+        for future in futures:
+            try:
+                for review in future.result():
+                    merged.setdefault(review["reviewId"], review)
+            except Exception as e:
+                print(f"Scraper error: {str(e)}")
+        ordered = sorted(merged.values(), key=lambda review: review.get("at") or datetime.min, reverse=True)
+        return ordered[:budget]
+
+
+def parse_locales(value):
+    # "en:us,en:gb" -> [("en", "us"), ("en", "gb")]
+    locales = []
+    for pair in value.split(","):
+        if pair.strip():
+            lang, _, country = pair.strip().partition(":")
+            locales.append((lang, country or "us"))
+    return locales or [("en", "us")]
@@ -0,0 +1,85 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+from trends import SENTIMENT_CODES
+
+_analyzer = None  # per worker process
+
+
+def sentiment_codes(scores):
+    # VADER compound scores -> codes indexing SENTIMENT_LABELS: Delighted from
+    # 0.5, Happy from 0.1, Angry up to -0.5, Frustrated up to -0.1, else Neutral
+    scores = np.asarray(scores, dtype=np.float64)
+    return np.select(
+        [scores >= 0.5, scores >= 0.1, scores <= -0.5, scores <= -0.1],
+        [SENTIMENT_CODES["Delighted"], SENTIMENT_CODES["Happy"], SENTIMENT_CODES["Angry"], SENTIMENT_CODES["Frustrated"]],
+        SENTIMENT_CODES["Neutral"]
+    ).astype(np.int8)
+
+
+def _score_chunk(texts, analyzer=None):
+    global _analyzer
+    if analyzer is None:
+        if _analyzer is None:
+            _analyzer = SentimentIntensityAnalyzer()
+        analyzer = _analyzer
+    scores = np.empty(len(texts), dtype=np.float64)
+    for i, text in enumerate(texts):
+        try:
+            scores[i] = analyzer.polarity_scores(text)['compound']
+        except Exception as e:
+            print(f"Sentiment analysis error: {str(e)}")
+            scores[i] = 0.0
+    return scores
+
+
+class SentimentEngine:
+    # VADER compound scores for many texts at once. Small inputs are scored in
+    # this process; from parallel_min texts up, chunks of chunk_size texts are
+    # spread over a pool of worker processes (VADER is pure Python, so
+    # threads would share one core).
+
+    def __init__(self, workers=None, chunk_size=2000, parallel_min=5000):
+        self.analyzer = SentimentIntensityAnalyzer()
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.parallel_min = parallel_min
+        self._pool = None
+        self._pool_pid = None
+        self._pool_lock = threading.Lock()
+
+    def _ensure_pool(self):
+        # A pool doesn't survive fork, so each process starts its own on first
+        # use (see PRELOAD_MODELS in main.py)
+        if self._pool_pid == os.getpid():
+            return self._pool
+        with self._pool_lock:
+            if self._pool_pid != os.getpid():
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                self._pool_pid = os.getpid()
+        return self._pool
+
+    def score(self, text):
+        return float(_score_chunk([text], self.analyzer)[0])
+
+    def score_many(self, texts):
+        texts = list(texts)
+        if self.workers < 2 or len(texts) < max(self.parallel_min, 2):
+            return _score_chunk(texts, self.analyzer)
+        # At least one chunk per worker, so mid-sized inputs use every core
+        chunk_size = min(self.chunk_size, -(-len(texts) // self.workers))
+        chunks = [texts[start:start + chunk_size] for start in range(0, len(texts), chunk_size)]
+        return np.concatenate(list(self._ensure_pool().map(_score_chunk, chunks)))
+
+    def polarity_scores(self, text):
+        return self.analyzer.polarity_scores(text)
+
+    def shutdown(self):
+        if self._pool is not None and self._pool_pid == os.getpid():
+            self._pool.shutdown()
+        self._pool = None
+        self._pool_pid = None
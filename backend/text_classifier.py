@@ -0,0 +1,118 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+ARTIFACT_FILE = "artifact.json"
+LATEST_FILE = "LATEST"
+
+
+def resolve_artifact(path):
+    # Accepts a version directory, or the parent directory written by
+    # train_model.py whose LATEST file names the current version
+    if os.path.isfile(os.path.join(path, ARTIFACT_FILE)):
+        return path
+    latest = os.path.join(path, LATEST_FILE)
+    if os.path.isfile(latest):
+        with open(latest, encoding="utf-8") as f:
+            return os.path.join(path, f.read().strip())
+    raise FileNotFoundError(f"No model artifact in {path}")
+
+
+def read_artifact(path):
+    with open(os.path.join(resolve_artifact(path), ARTIFACT_FILE), encoding="utf-8") as f:
+        return json.load(f)
+
+
+class FineTunedClassifier:
+    # Sequence classifier trained by train_model.py, callable with the same
+    # interface as the zero-shot pipeline. One forward pass scores every label,
+    # instead of one NLI pass per candidate label.
+    backend = "fine-tuned"
+
+    def __init__(self, path, device=-1, max_length=256):
+        # torch/transformers are imported here so reading artifacts stays cheap
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+        self._torch = torch
+        self.artifact_dir = resolve_artifact(path)
+        self.artifact = read_artifact(self.artifact_dir)
+        self.version = self.artifact["version"]
+        self.labels = self.artifact["labels"]
+        self.max_length = max_length
+        self.device = torch.device(f"cuda:{device}" if device >= 0 else "cpu")
+        self.tokenizer = AutoTokenizer.from_pretrained(self.artifact_dir)
+        self.model = AutoModelForSequenceClassification.from_pretrained(self.artifact_dir).to(self.device).eval()
+
+    def predict_proba(self, texts, batch_size=32):
+        # Sorted by length so each batch carries little padding
+        probabilities = np.zeros((len(texts), len(self.labels)), dtype=np.float32)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        with self._torch.inference_mode():
+            for start in range(0, len(order), batch_size):
+                batch = order[start:start + batch_size]
+                encoded = self.tokenizer(
+                    [texts[i] for i in batch],
+                    truncation=True,
+                    max_length=self.max_length,
+                    padding=True,
+                    return_tensors="pt"
+                ).to(self.device)
+                logits = self.model(**encoded).logits
+                probabilities[batch] = self._torch.softmax(logits, dim=-1).cpu().numpy()
+        return probabilities
+
+    def __call__(self, sequences, candidate_labels, multi_label=False, batch_size=32, **kwargs):
+        single = isinstance(sequences, str)
+        texts = [sequences] if single else list(sequences)
+        if not texts:
+            return []
+        probabilities = self.predict_proba(texts, batch_size or 32)
+        # Labels the model was not trained on score 0
+        columns = [self.labels.index(label) if label in self.labels else None for label in candidate_labels]
+        results = []
+        for text, row in zip(texts, probabilities):
+            scores = [float(row[column]) if column is not None else 0.0 for column in columns]
+            total = sum(scores)
+            if not multi_label and total > 0:
+                scores = [score / total for score in scores]
+            ranked = sorted(zip(candidate_labels, scores), key=lambda item: -item[1])
+            results.append({
+                "sequence": text,
+                "labels": [label for label, _ in ranked],
+                "scores": [score for _, score in ranked]
+            })
+        return results[0] if single else results
+
+
+if __name__ == "__main__":
+    from zero_shot import BACKENDS, build_zero_shot_classifier, parity_check
+
+    parser = argparse.ArgumentParser(description="Compare the fine-tuned classifier against zero-shot BART on a held-out set")
+    parser.add_argument("--artifact", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "feedback_classifier"))
+    parser.add_argument("--heldout", help="JSONL with text and label fields (default: the artifact's heldout.jsonl)")
+    parser.add_argument("--model", default="facebook/bart-large-mnli")
+    parser.add_argument("--backend", choices=BACKENDS, default="pytorch", help="Zero-shot backend to compare against")
+    parser.add_argument("--limit", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--max-length", type=int, default=256)
+    args = parser.parse_args()
+
+    candidate = FineTunedClassifier(args.artifact, max_length=args.max_length)
+    heldout_path = args.heldout or os.path.join(candidate.artifact_dir, "heldout.jsonl")
+    with open(heldout_path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()][:args.limit]
+
+    reference = build_zero_shot_classifier(args.model, args.backend, max_length=args.max_length)
+    report = parity_check(
+        reference,
+        candidate,
+        [record["text"] for record in records],
+        candidate_labels=candidate.labels,
+        batch_size=args.batch_size,
+        expected=[record["label"] for record in records]
+    )
+    report["candidate_version"] = candidate.version
+    print(json.dumps(report, indent=2))
@@ -1,71 +1,156 @@
-import pandas as pd
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, Trainer, TrainingArguments
-from sklearn.model_selection import train_test_split
-import torch
-import joblib
-
-# Load preprocessed data
-df = pd.read_csv("preprocessed_data.csv")  # Your preprocessed dataset
-
-# Preprocess data
-train_texts, val_texts, train_labels, val_labels = train_test_split(
-    df["reviewText"].tolist(),
-    df["category"].astype("category").cat.codes.tolist(),  # Convert labels to integers
-    test_size=0.2,
-    random_state=42
+import argparse
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+from transformers import (
+    AutoTokenizer,
+    AutoModelForSequenceClassification,
+    DataCollatorWithPadding,
+    Trainer,
+    TrainingArguments
 )
+from transformers.trainer_pt_utils import LengthGroupedSampler
+from sklearn.metrics import accuracy_score, classification_report, f1_score
 
-# Load label mapping for later use
-label_map = joblib.load("label_map.pkl")
+from training_data import TokenCache, TokenizedDataset, build_token_cache, padding_stats
 
-# Initialize tokenizer and model
-model_name = "distilbert-base-uncased"
-tokenizer = AutoTokenizer.from_pretrained(model_name)
-model = AutoModelForSequenceClassification.from_pretrained(
-    model_name,
-    num_labels=len(label_map)
-)
+# Fine-tunes a single-pass review classifier and writes a versioned artifact:
+#
+#   models/feedback_classifier/
+#       LATEST                   name of the newest version
+#       <version>/
+#           config.json, model weights, tokenizer files
+#           artifact.json        version, labels, metrics, training settings
+#           heldout.jsonl        validation split, for comparing against BART
+#
+# The backend serves it with CATEGORIZATION_MODEL=fine-tuned (see main.py).
+#
+# The CSV is streamed and tokenized once into models/token_cache/ (see
+# training_data.py), so large corpora train in bounded memory.
 
-# Create PyTorch datasets
-class FeedbackDataset(torch.utils.data.Dataset):
-    def __init__(self, texts, labels):
-        self.encodings = tokenizer(texts, truncation=True, padding=True)
-        self.labels = labels
+parser = argparse.ArgumentParser(description="Fine-tune the review category classifier")
+parser.add_argument("--data", default="preprocessed_data.csv", help="CSV with reviewText and category columns")
+parser.add_argument("--base-model", default="distilbert-base-uncased")
+parser.add_argument("--output-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "feedback_classifier"))
+parser.add_argument("--version", default=datetime.now().strftime("%Y%m%d-%H%M%S"))
+parser.add_argument("--epochs", type=float, default=3)
+parser.add_argument("--max-length", type=int, default=256)
+parser.add_argument("--batch-size", type=int, default=16)
+parser.add_argument("--chunk-size", type=int, default=50000, help="CSV rows read and tokenized at a time")
+parser.add_argument("--cache-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "token_cache"))
+args = parser.parse_args()
 
-    def __getitem__(self, idx):
-        item = {key: torch.tensor(val[idx]) for key, val in self.encodings.items()}
-        item["labels"] = torch.tensor(self.labels[idx])
-        return item
+# Tokenize the corpus chunk by chunk into a memory-mapped cache (reused
+# across runs until the CSV, tokenizer or max length changes)
+tokenizer = AutoTokenizer.from_pretrained(args.base_model)
+cache = TokenCache(build_token_cache(args.data, tokenizer, args.cache_dir, args.max_length, args.chunk_size))
+labels = cache.labels
+train_indices, val_indices = cache.split(test_size=0.2, seed=42)
+train_dataset = TokenizedDataset(cache, train_indices)
+val_dataset = TokenizedDataset(cache, val_indices)
+val_labels = cache.targets[val_indices]
 
-    def __len__(self):
-        return len(self.labels)
+# Padding to the longest review of each batch, with batches grouped by length
+sampler = LengthGroupedSampler(args.batch_size, lengths=train_dataset.lengths)
+print(f"{len(cache)} reviews, {len(labels)} labels. Padding per batch: "
+      f"{padding_stats(train_dataset.lengths, args.batch_size):.0%} random order, "
+      f"{padding_stats([train_dataset.lengths[i] for i in sampler], args.batch_size):.0%} grouped by length.")
+
+# Initialize model
+model = AutoModelForSequenceClassification.from_pretrained(
+    args.base_model,
+    num_labels=len(labels),
+    id2label=dict(enumerate(labels)),
+    label2id={label: i for i, label in enumerate(labels)}
+)
 
-train_dataset = FeedbackDataset(train_texts, train_labels)
-val_dataset = FeedbackDataset(val_texts, val_labels)
+class LengthGroupedTrainer(Trainer):
+    # Uses the lengths already in the cache instead of having the sampler
+    # read every training example to measure it
+    def _get_train_sampler(self, *args, **kwargs):
+        return LengthGroupedSampler(
+            self.args.train_batch_size * self.args.gradient_accumulation_steps,
+            lengths=self.train_dataset.lengths
+        )
+
+def compute_metrics(eval_prediction):
+    predictions = np.argmax(eval_prediction.predictions, axis=-1)
+    return {
+        "accuracy": accuracy_score(eval_prediction.label_ids, predictions),
+        "macro_f1": f1_score(eval_prediction.label_ids, predictions, average="macro")
+    }
 
 # Train the model
 training_args = TrainingArguments(
     output_dir="feedback_model",
-    evaluation_strategy="epoch",
+    eval_strategy="epoch",
     learning_rate=2e-5,
-    per_device_train_batch_size=16,
-    per_device_eval_batch_size=16,
-    num_train_epochs=3,
+    per_device_train_batch_size=args.batch_size,
+    per_device_eval_batch_size=args.batch_size,
+    num_train_epochs=args.epochs,
     weight_decay=0.01,
     save_total_limit=2
 )
 
-trainer = Trainer(
+trainer = LengthGroupedTrainer(
     model=model,
     args=training_args,
     train_dataset=train_dataset,
-    eval_dataset=val_dataset
+    eval_dataset=val_dataset,
+    data_collator=DataCollatorWithPadding(tokenizer),
+    compute_metrics=compute_metrics
 )
 
 trainer.train()
 
-# Save the trained model and tokenizer
-model.save_pretrained("feedback_classification_model")
-tokenizer.save_pretrained("feedback_classification_model")
+# Evaluate on the held-out split
+prediction = trainer.predict(val_dataset)
+val_predictions = np.argmax(prediction.predictions, axis=-1)
+metrics = {
+    "accuracy": accuracy_score(val_labels, val_predictions),
+    "macro_f1": f1_score(val_labels, val_predictions, average="macro"),
+    "per_label": classification_report(
+        val_labels,
+        val_predictions,
+        labels=list(range(len(labels))),
+        target_names=labels,
+        output_dict=True,
+        zero_division=0
+    )
+}
+
+# Save the trained model, tokenizer and metadata as a new version
+version_dir = os.path.join(args.output_dir, args.version)
+os.makedirs(version_dir, exist_ok=True)
+model.save_pretrained(version_dir)
+tokenizer.save_pretrained(version_dir)
+
+with open(os.path.join(version_dir, "artifact.json"), "w", encoding="utf-8") as f:
+    json.dump({
+        "version": args.version,
+        "base_model": args.base_model,
+        "labels": labels,
+        "label2id": {label: i for i, label in enumerate(labels)},
+        "metrics": metrics,
+        "train_size": len(train_dataset),
+        "heldout_size": len(val_dataset),
+        "max_length": args.max_length,
+        "epochs": args.epochs,
+        "data": os.path.basename(args.data),
+        "created_at": datetime.now().isoformat(timespec="seconds")
+    }, f, indent=2)
+
+with open(os.path.join(version_dir, "heldout.jsonl"), "w", encoding="utf-8") as f:
+    for text, label in zip(cache.texts(args.data, val_indices, args.chunk_size), val_labels):
+        f.write(json.dumps({"text": text, "label": labels[label]}) + "\n")
+
+# Point LATEST at the new version only once it is complete
+latest_tmp = os.path.join(args.output_dir, "LATEST.tmp")
+with open(latest_tmp, "w", encoding="utf-8") as f:
+    f.write(args.version)
+os.replace(latest_tmp, os.path.join(args.output_dir, "LATEST"))
 
-print("Training completed. Model saved.")
\ No newline at end of file
+print(f"Training completed. Model {args.version} saved to {version_dir} "
+      f"(accuracy {metrics['accuracy']:.3f}, macro F1 {metrics['macro_f1']:.3f}).")
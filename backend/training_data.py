@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import torch
+
+# Streaming input pipeline for train_model.py. The corpus is read in chunks
+# and tokenized once into a cache directory:
+#
+#   <cache>/
+#       tokens.bin      every example's token ids, concatenated (uint16/int32)
+#       offsets.npy     start of each example in tokens.bin (n + 1 entries)
+#       labels.npy      integer label of each example
+#       rows.npy        CSV row of each example, to find its text again
+#       meta.json       labels, tokenizer, max_length and the source it was built from
+#
+# Examples are read back through a memory map and padded per batch, so RAM
+# stays bounded by the chunk size and the batch size, not the corpus size.
+
+TEXT_COLUMN = "reviewText"
+LABEL_COLUMN = "category"
+CACHE_VERSION = 1
+
+
+def iter_review_chunks(path, chunksize=50000):
+    # Yields (rows, texts, labels) per chunk; rows are positions in the CSV
+    start = 0
+    for chunk in pd.read_csv(path, usecols=[TEXT_COLUMN, LABEL_COLUMN], chunksize=chunksize):
+        rows = np.arange(start, start + len(chunk))
+        start += len(chunk)
+        keep = chunk[TEXT_COLUMN].notna().to_numpy() & chunk[LABEL_COLUMN].notna().to_numpy()
+        if keep.any():
+            chunk = chunk[keep]
+            yield rows[keep], chunk[TEXT_COLUMN].astype(str).tolist(), chunk[LABEL_COLUMN].astype(str).tolist()
+
+
+def cache_key(path, tokenizer_name, max_length):
+    # Rebuilt whenever the CSV, the tokenizer or the truncation length changes
+    stat = os.stat(path)
+    source = f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}:{tokenizer_name}:{max_length}:{CACHE_VERSION}"
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()[:16]
+
+
+def build_token_cache(path, tokenizer, cache_root, max_length=256, chunksize=50000):
+    key = cache_key(path, tokenizer.name_or_path, max_length)
+    cache_dir = os.path.join(cache_root, key)
+    if os.path.isfile(os.path.join(cache_dir, "meta.json")):
+        return cache_dir
+
+    # Built in a scratch directory and renamed into place once complete
+    scratch = f"{cache_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(scratch, ignore_errors=True)
+    os.makedirs(scratch)
+    dtype = np.uint16 if len(tokenizer) <= np.iinfo(np.uint16).max else np.int32
+    label_ids = {}
+    lengths, labels, rows = [], [], []
+    with open(os.path.join(scratch, "tokens.bin"), "wb") as tokens_file:
+        for chunk_rows, texts, chunk_labels in iter_review_chunks(path, chunksize):
+            encoded = tokenizer(texts, truncation=True, max_length=max_length)["input_ids"]
+            tokens_file.write(np.fromiter(
+                (token for ids in encoded for token in ids),
+                dtype=dtype,
+                count=sum(len(ids) for ids in encoded)
+            ).tobytes())
+            lengths.append(np.fromiter((len(ids) for ids in encoded), dtype=np.int64, count=len(encoded)))
+            labels.append(np.array([label_ids.setdefault(label, len(label_ids)) for label in chunk_labels], dtype=np.int64))
+            rows.append(chunk_rows)
+
+    # Labels are numbered in order of appearance while streaming; renumber
+    # them alphabetically so the label map doesn't depend on row order
+    names = sorted(label_ids)
+    remap = np.empty(len(names), dtype=np.int64)
+    for i, name in enumerate(names):
+        remap[label_ids[name]] = i
+    lengths = np.concatenate(lengths) if lengths else np.zeros(0, dtype=np.int64)
+    np.save(os.path.join(scratch, "offsets.npy"), np.concatenate(([0], np.cumsum(lengths))))
+    np.save(os.path.join(scratch, "labels.npy"), remap[np.concatenate(labels)] if labels else np.zeros(0, dtype=np.int64))
+    np.save(os.path.join(scratch, "rows.npy"), np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64))
+    with open(os.path.join(scratch, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "source": os.path.abspath(path),
+            "tokenizer": tokenizer.name_or_path,
+            "max_length": max_length,
+            "dtype": np.dtype(dtype).name,
+            "labels": names,
+            "examples": int(len(lengths)),
+            "tokens": int(lengths.sum())
+        }, f, indent=2)
+
+    try:
+        os.replace(scratch, cache_dir)
+    except OSError:
+        # Another run finished the same cache first
+        shutil.rmtree(scratch, ignore_errors=True)
+    return cache_dir
+
+
+class TokenCache:
+    # Read side of a cache directory; tokens.bin is memory-mapped, so only
+    # the pages a batch touches are loaded
+    def __init__(self, cache_dir):
+        with open(os.path.join(cache_dir, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.labels = self.meta["labels"]
+        self.offsets = np.load(os.path.join(cache_dir, "offsets.npy"))
+        self.targets = np.load(os.path.join(cache_dir, "labels.npy"))
+        self.rows = np.load(os.path.join(cache_dir, "rows.npy"))
+        self.lengths = np.diff(self.offsets)
+        tokens_path = os.path.join(cache_dir, "tokens.bin")
+        if os.path.getsize(tokens_path):
+            self.tokens = np.memmap(tokens_path, dtype=self.meta["dtype"], mode="r")
+        else:
+            self.tokens = np.zeros(0, dtype=self.meta["dtype"])
+
+    def __len__(self):
+        return len(self.targets)
+
+    def split(self, test_size=0.2, seed=42):
+        # Stratified by label so rare categories appear on both sides
+        rng = np.random.default_rng(seed)
+        train, heldout = [], []
+        for label in range(len(self.labels)):
+            members = rng.permutation(np.flatnonzero(self.targets == label))
+            cut = int(round(len(members) * test_size)) if len(members) > 1 else 0
+            heldout.append(members[:cut])
+            train.append(members[cut:])
+        return np.sort(np.concatenate(train)), np.sort(np.concatenate(heldout))
+
+    def texts(self, path, indices, chunksize=50000):
+        # Streams the CSV again to recover the raw text of the given examples
+        wanted = dict(zip(self.rows[indices].tolist(), range(len(indices))))
+        found = [None] * len(indices)
+        for rows, texts, _ in iter_review_chunks(path, chunksize):
+            for row, text in zip(rows.tolist(), texts):
+                if row in wanted:
+                    found[wanted[row]] = text
+        return found
+
+
+class TokenizedDataset(torch.utils.data.Dataset):
+    # One example per index, unpadded; DataCollatorWithPadding pads each
+    # batch to its own longest example
+    def __init__(self, cache, indices):
+        self.cache = cache
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.lengths = cache.lengths[self.indices].tolist()
+
+    def __getitem__(self, idx):
+        i = self.indices[idx]
+        start, end = self.cache.offsets[i], self.cache.offsets[i + 1]
+        return {
+            "input_ids": self.cache.tokens[start:end].astype(np.int64).tolist(),
+            "labels": int(self.cache.targets[i])
+        }
+
+    def __len__(self):
+        return len(self.indices)
+
+
+def padding_stats(lengths, batch_size):
+    # Share of padded positions for batches drawn in the given order
+    lengths = np.asarray(lengths, dtype=np.int64)
+    if not len(lengths):
+        return 0.0
+    padded = sum(
+        int(lengths[start:start + batch_size].max()) * len(lengths[start:start + batch_size])
+        for start in range(0, len(lengths), batch_size)
+    )
+    return 1 - lengths.sum() / padded
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+SENTIMENT_LABELS = ["Delighted", "Happy", "Neutral", "Frustrated", "Angry"]
+SENTIMENT_CODES = {label: code for code, label in enumerate(SENTIMENT_LABELS)}
+
+# period -> (days covered, grouping)
+PERIODS = {
+    "1w": (7, "day"),  # 7 bars (one per day)
+    "1m": (30, "week"),  # 4 bars (one per week)
+    "3m": (90, "biweekly"),  # 6 bars (2-week intervals)
+    "6m": (180, "month"),  # 6 bars (one per month)
+    "1y": (365, "month")  # 12 bars (one per month)
+}
+DEFAULT_PERIOD = "1y"
+
+MONTH_NAMES = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+WEEKDAY_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+EPOCH = datetime(1970, 1, 1)
+
+
+def _to_day_number(moment):
+    # Fractional days since the epoch, so a cutoff keeps its time of day
+    return (moment - EPOCH) / timedelta(days=1)
+
+
+def bucket_trends(days, codes, period, now=None):
+    span, group_by = PERIODS.get(period, PERIODS[DEFAULT_PERIOD])
+    cutoff = (now or datetime.now()) - timedelta(days=span)
+    cutoff_day = _to_day_number(cutoff)
+
+    keep = days >= cutoff_day
+    days = days[keep]
+    codes = codes[keep]
+    if not len(days):
+        return {}
+
+    # Whole days since the cutoff, matching (review_date - cutoff).days
+    offsets = np.floor(days - cutoff_day).astype(np.int64)
+    dates = days.astype("datetime64[D]")
+
+    if group_by == "month":
+        month = dates.astype("datetime64[M]").astype(np.int64) % 12
+        bucket_ids = month
+        labels = {i: MONTH_NAMES[i] for i in range(12)}
+    elif group_by == "biweekly":
+        bucket_ids = np.minimum(offsets // 14, 5)
+        labels = {}
+        for i in range(6):
+            week_start = cutoff + timedelta(days=i * 14)
+            week_end = week_start + timedelta(days=13)
+            labels[i] = f"{week_start.strftime('%d %b')}-{week_end.strftime('%d %b')}"
+    elif group_by == "week":
+        bucket_ids = np.minimum(offsets // 7, 3)
+        labels = {i: f"Week {i + 1}" for i in range(4)}
+    else:
+        # 1970-01-01 was a Thursday
+        bucket_ids = (days + 3) % 7
+        labels = {i: WEEKDAY_NAMES[i] for i in range(7)}
+
+    size = len(labels) if group_by != "month" else 12
+    counts = np.bincount(
+        bucket_ids * len(SENTIMENT_LABELS) + codes,
+        minlength=size * len(SENTIMENT_LABELS)
+    ).reshape(size, len(SENTIMENT_LABELS))
+
+    # Order buckets chronologically by the newest review in each
+    latest = np.full(size, np.iinfo(np.int64).min)
+    np.maximum.at(latest, bucket_ids, days)
+    present = np.flatnonzero(counts.sum(axis=1))
+    ordered = sorted(present, key=lambda i: latest[i])
+
+    return {
+        labels[i]: dict(zip(SENTIMENT_LABELS, counts[i].tolist()))
+        for i in ordered
+    }
+
+
+def calculate_all_trends(days, codes, now=None):
+    now = now or datetime.now()
+    return {period: bucket_trends(days, codes, period, now) for period in PERIODS}
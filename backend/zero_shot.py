@@ -0,0 +1,155 @@
+import argparse
+import time
+
+import torch
+from transformers import AutoModelForSequenceClassification, AutoTokenizer, pipeline
+
+BACKENDS = ("pytorch", "quantized", "onnx")
+DEFAULT_LABELS = [
+    "Feature Requests",
+    "Bugs",
+    "UX/UI",
+    "Navigation Issues",
+    "Performance",
+    "Others"
+]
+
+
+class ZeroShotClassifier:
+    # Callable with the same interface as the transformers zero-shot pipeline.
+    # Inputs are sorted by length before batching so each batch carries little
+    # padding, and results are returned in the caller's order.
+
+    def __init__(self, pipe, backend, max_length=None):
+        self.pipe = pipe
+        self.backend = backend
+        if max_length:
+            pipe.tokenizer.model_max_length = max_length
+
+    def __call__(self, sequences, candidate_labels, multi_label=False, batch_size=8, **kwargs):
+        single = isinstance(sequences, str)
+        texts = [sequences] if single else list(sequences)
+        if not texts:
+            return []
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        results = self.pipe(
+            [texts[i] for i in order],
+            candidate_labels=candidate_labels,
+            multi_label=multi_label,
+            batch_size=batch_size,
+            **kwargs
+        )
+        if isinstance(results, dict):
+            results = [results]
+        ordered = [None] * len(texts)
+        for position, i in enumerate(order):
+            ordered[i] = results[position]
+        return ordered[0] if single else ordered
+
+
+def build_zero_shot_classifier(model_id, backend="pytorch", config=None, device=-1, max_length=256, batch_size=8):
+    if backend == "pytorch":
+        pipe = pipeline(
+            "zero-shot-classification",
+            model=model_id,
+            config=config,
+            device=device,
+            batch_size=batch_size
+        )
+    elif backend == "quantized":
+        # Dynamic int8 quantization of the Linear layers, CPU only
+        tokenizer = AutoTokenizer.from_pretrained(model_id)
+        model = AutoModelForSequenceClassification.from_pretrained(model_id, config=config)
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        pipe = pipeline(
+            "zero-shot-classification",
+            model=model,
+            tokenizer=tokenizer,
+            device=-1,
+            batch_size=batch_size
+        )
+    elif backend == "onnx":
+        # Exported ONNX graph run with onnxruntime (requires optimum[onnxruntime])
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+        tokenizer = AutoTokenizer.from_pretrained(model_id)
+        model = ORTModelForSequenceClassification.from_pretrained(model_id, config=config, export=True)
+        pipe = pipeline(
+            "zero-shot-classification",
+            model=model,
+            tokenizer=tokenizer,
+            batch_size=batch_size
+        )
+    else:
+        raise ValueError(f"Unknown zero-shot backend '{backend}', expected one of {', '.join(BACKENDS)}")
+    return ZeroShotClassifier(pipe, backend, max_length)
+
+
+def parity_check(reference, candidate, texts, candidate_labels=DEFAULT_LABELS, batch_size=8, expected=None):
+    # Compares a candidate backend with the reference (PyTorch) path on the same
+    # texts; with expected (gold) labels it also reports each side's accuracy
+    start = time.perf_counter()
+    reference_results = reference(texts, candidate_labels, batch_size=batch_size)
+    reference_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    candidate_results = candidate(texts, candidate_labels, batch_size=batch_size)
+    candidate_seconds = time.perf_counter() - start
+
+    agreements = 0
+    score_drift = 0.0
+    for reference_result, candidate_result in zip(reference_results, candidate_results):
+        agreements += reference_result["labels"][0] == candidate_result["labels"][0]
+        reference_scores = dict(zip(reference_result["labels"], reference_result["scores"]))
+        candidate_scores = dict(zip(candidate_result["labels"], candidate_result["scores"]))
+        score_drift += max(abs(reference_scores[label] - candidate_scores[label]) for label in candidate_labels)
+
+    samples = len(texts)
+    report = {
+        "samples": samples,
+        "reference_backend": getattr(reference, "backend", "reference"),
+        "candidate_backend": getattr(candidate, "backend", "candidate"),
+        "label_agreement": agreements / samples if samples else 1.0,
+        "mean_max_score_drift": score_drift / samples if samples else 0.0,
+        "reference_seconds": round(reference_seconds, 3),
+        "candidate_seconds": round(candidate_seconds, 3),
+        "reference_ms_per_text": round(reference_seconds / samples * 1000, 2) if samples else None,
+        "candidate_ms_per_text": round(candidate_seconds / samples * 1000, 2) if samples else None,
+        "reference_texts_per_second": round(samples / reference_seconds, 1) if reference_seconds else None,
+        "candidate_texts_per_second": round(samples / candidate_seconds, 1) if candidate_seconds else None,
+        "speedup": round(reference_seconds / candidate_seconds, 2) if candidate_seconds else None
+    }
+    if expected is not None and samples:
+        report["reference_accuracy"] = sum(
+            result["labels"][0] == label for result, label in zip(reference_results, expected)
+        ) / samples
+        report["candidate_accuracy"] = sum(
+            result["labels"][0] == label for result, label in zip(candidate_results, expected)
+        ) / samples
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare a zero-shot inference backend against the PyTorch path")
+    parser.add_argument("--model", default="facebook/bart-large-mnli")
+    parser.add_argument("--backend", choices=BACKENDS, default="quantized")
+    parser.add_argument("--texts", help="File with one review per line")
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--max-length", type=int, default=256)
+    args = parser.parse_args()
+
+    if args.texts:
+        with open(args.texts, encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()][:args.limit]
+    else:
+        texts = [
+            "The app crashes every time I open it.",
+            "Please add a dark mode.",
+            "Very slow and laggy after the update.",
+            "The new interface is confusing and ugly.",
+            "I can't go back from the settings screen.",
+            "Great app, no complaints."
+        ]
+
+    reference = build_zero_shot_classifier(args.model, "pytorch", max_length=args.max_length)
+    candidate = build_zero_shot_classifier(args.model, args.backend, max_length=args.max_length)
+    print(parity_check(reference, candidate, texts))
@@ -1,7 +1,6 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { Bar, Doughnut } from 'react-chartjs-2';
 import 'chart.js/auto';
-import axios from 'axios';
 import './App.css';
 
 function App() {
@@ -13,9 +12,14 @@ function App() {
   const [lastAnalyzedUrl, setLastAnalyzedUrl] = useState('');
   const resultsContainerRef = useRef(null);
 
-  // Refetch data when period changes
+  // Switch periods locally when the response carries every period's trends,
+  // otherwise refetch
   useEffect(() => {
-    if (lastAnalyzedUrl && analysisResult) {
+    if (!lastAnalyzedUrl || !analysisResult) return;
+    const trendsByPeriod = analysisResult.trends_by_period;
+    if (trendsByPeriod && trendsByPeriod[selectedPeriod]) {
+      setAnalysisResult({ ...analysisResult, trends: trendsByPeriod[selectedPeriod] });
+    } else {
       fetchAnalysis(lastAnalyzedUrl, selectedPeriod);
     }
   }, [selectedPeriod]);
@@ -25,21 +29,46 @@ function App() {
     setErrorMessage('');
 
     try {
-      const response = await axios.post('http://127.0.0.1:5001/analyze', {
-        url: url,
-        period: period,
+      // Stream NDJSON stages so charts render as soon as their data is ready
+      const response = await fetch('http://127.0.0.1:5001/analyze/stream', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ url: url, period: period }),
       });
 
-      if (response.status !== 200) {
+      if (!response.ok) {
         setAnalysisResult(null);
-        const errorData = response.data;
+        const errorData = await response.json().catch(() => ({}));
         setErrorMessage(errorData.error || 'Unknown error');
-        setLoading(false);
         return;
       }
 
-      const data = response.data;
-      setAnalysisResult(data);
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let partial = {};
+
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+
+        for (const line of lines) {
+          if (!line.trim()) continue;
+          const event = JSON.parse(line);
+          if (event.stage === 'error') {
+            setAnalysisResult(null);
+            setErrorMessage(event.data.error || 'Unknown error');
+            return;
+          }
+          if (event.stage !== 'done') {
+            partial = { ...partial, ...event.data };
+            setAnalysisResult(partial);
+          }
+        }
+      }
     } catch (error) {
       console.error('Error fetching data:', error);
       setAnalysisResult(null);